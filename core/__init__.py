@@ -1,4 +1,22 @@
-from .network import IrrigationNetwork
-from .network_analyzer import NetworkAnalyzer
-from .strahler import StrahlerAnalyzer
-from .validator import NetworkValidator
\ No newline at end of file
+from importlib import import_module
+
+# Public classes are imported from their modules on first access (PEP 562),
+# so importing one core module does not pull in the rest of the package
+_EXPORTS = {
+    'IrrigationNetwork': '.network',
+    'NetworkAnalyzer': '.network_analyzer',
+    'StrahlerAnalyzer': '.strahler',
+    'NetworkValidator': '.validator',
+}
+
+__all__ = list(_EXPORTS)
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
\ No newline at end of file
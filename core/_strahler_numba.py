@@ -0,0 +1,89 @@
+# core/_strahler_numba.py
+"""
+Optional Numba-compiled Strahler kernel over CSR arrays.
+
+Numba is not a required dependency; when it is missing HAVE_NUMBA is False
+and StrahlerAnalyzer falls back to its pure-Python sweep.
+"""
+from typing import List, Tuple
+from core.csr import CSRGraph
+
+try:
+    import numba
+    import numpy as np
+except ImportError:
+    numba = None
+
+HAVE_NUMBA = numba is not None
+
+def _strahler_csr(indptr_out, indices_out, indptr_in, indices_in):
+    """
+    Kahn-style sweep from the sinks using a preallocated array queue.
+
+    Nodes are taken first-in first-out, like the deque in
+    StrahlerAnalyzer._sweep_strahler, so both backends resolve nodes in the
+    same order.
+
+    Returns:
+        Tuple of (per-node Strahler numbers with -1 for nodes on or upstream
+        of a cycle, indices of resolved nodes in computation order)
+    """
+    n = len(indptr_out) - 1
+    strahler = np.full(n, -1, np.int32)
+    order = np.empty(n, np.int32)
+    remaining = np.empty(n, np.int32)
+    max_child = np.zeros(n, np.int32)
+    max_count = np.zeros(n, np.int32)
+
+    # Every node is queued at most once, so n slots are enough
+    ready = np.empty(n, np.int32)
+    head = 0
+    tail = 0
+    for node in range(n):
+        remaining[node] = indptr_out[node + 1] - indptr_out[node]
+        if remaining[node] == 0:
+            ready[tail] = node
+            tail += 1
+
+    resolved = 0
+    while head < tail:
+        node = ready[head]
+        head += 1
+        if max_count[node] > 1:
+            number = max_child[node] + 1
+        elif max_count[node] == 1:
+            number = max_child[node]
+        else:
+            number = 1  # Sink
+        strahler[node] = number
+        order[resolved] = node
+        resolved += 1
+
+        for k in range(indptr_in[node], indptr_in[node + 1]):
+            parent = indices_in[k]
+            if number > max_child[parent]:
+                max_child[parent] = number
+                max_count[parent] = 1
+            elif number == max_child[parent]:
+                max_count[parent] += 1
+            remaining[parent] -= 1
+            if remaining[parent] == 0:
+                ready[tail] = parent
+                tail += 1
+
+    return strahler, order[:resolved]
+
+if HAVE_NUMBA:
+    strahler_csr = numba.njit(cache=True)(_strahler_csr)
+
+def sweep_strahler(csr: CSRGraph) -> Tuple[List[int], List[int]]:
+    """
+    Run the compiled kernel on a CSR graph built with array('i') buffers.
+
+    Returns:
+        Tuple of (per-node Strahler numbers, resolved node indices in order)
+    """
+    arrays = [np.frombuffer(a, dtype=np.intc)
+              for a in (csr.indptr_out, csr.indices_out, csr.indptr_in, csr.indices_in)]
+    strahler, order = strahler_csr(*arrays)
+    return strahler.tolist(), order.tolist()
@@ -0,0 +1,62 @@
+# core/_validator_numba.py
+"""
+Optional Numba-compiled validation kernels over CSR arrays.
+
+Numba is not a required dependency; when it is missing HAVE_NUMBA is False
+and NetworkValidator keeps its pure-Python checks.
+"""
+from array import array
+from typing import List, Tuple
+
+try:
+    import numba
+    import numpy as np
+except ImportError:
+    numba = None
+
+HAVE_NUMBA = numba is not None
+
+def _check_strahler_match(levels, strahler):
+    """Indices of nodes whose level differs from their Strahler number"""
+    bad = np.empty(len(levels), np.int32)
+    count = 0
+    for node in range(len(levels)):
+        if levels[node] != strahler[node]:
+            bad[count] = node
+            count += 1
+    return bad[:count]
+
+def _check_hierarchy(levels, indptr, indices):
+    """
+    Edges whose child level is not below the parent level.
+
+    Returns:
+        Tuple of (parent indices, child indices) of the violating edges
+    """
+    parents = np.empty(len(indices), np.int32)
+    children = np.empty(len(indices), np.int32)
+    count = 0
+    for parent in range(len(levels)):
+        level = levels[parent]
+        for k in range(indptr[parent], indptr[parent + 1]):
+            child = indices[k]
+            if levels[child] <= level and child != parent:
+                parents[count] = parent
+                children[count] = child
+                count += 1
+    return parents[:count], children[:count]
+
+if HAVE_NUMBA:
+    check_strahler_match = numba.njit(cache=True)(_check_strahler_match)
+    check_hierarchy = numba.njit(cache=True)(_check_hierarchy)
+
+def level_mismatches(levels: array, strahler: array) -> List[int]:
+    """Run check_strahler_match on array('i') buffers"""
+    return check_strahler_match(np.frombuffer(levels, dtype=np.intc),
+                                np.frombuffer(strahler, dtype=np.intc)).tolist()
+
+def hierarchy_violations(levels: array, indptr: array, indices: array) -> List[Tuple[int, int]]:
+    """Run check_hierarchy on array('i') buffers"""
+    parents, children = check_hierarchy(*[np.frombuffer(a, dtype=np.intc)
+                                          for a in (levels, indptr, indices)])
+    return list(zip(parents.tolist(), children.tolist()))
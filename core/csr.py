@@ -0,0 +1,55 @@
+# core/csr.py
+from array import array
+from typing import Dict, List, NamedTuple
+from models.components import NetworkComponent
+
+class CSRGraph(NamedTuple):
+    """
+    Compressed sparse row (CSR) adjacency of an irrigation network.
+
+    Node i's children are indices_out[indptr_out[i]:indptr_out[i + 1]] and its
+    parents are indices_in[indptr_in[i]:indptr_in[i + 1]]. Component IDs are
+    mapped to integer indices only at the API boundary via id_to_idx/idx_to_id.
+    """
+    indptr_out: array
+    indices_out: array
+    indptr_in: array
+    indices_in: array
+    id_to_idx: Dict[str, int]
+    idx_to_id: List[str]
+
+    def sources(self) -> List[int]:
+        """Indices of nodes with no incoming connections"""
+        indptr = self.indptr_in
+        return [node for node in range(len(indptr) - 1) if indptr[node] == indptr[node + 1]]
+
+    def sinks(self) -> List[int]:
+        """Indices of nodes with no outgoing connections"""
+        indptr = self.indptr_out
+        return [node for node in range(len(indptr) - 1) if indptr[node] == indptr[node + 1]]
+
+def build_csr(components: Dict[str, NetworkComponent]) -> CSRGraph:
+    """
+    Build CSR adjacency arrays for the given components.
+
+    Args:
+        components: Dictionary mapping component IDs to NetworkComponent objects
+
+    Returns:
+        CSRGraph with outgoing and incoming adjacency in component insertion order
+    """
+    idx_to_id = list(components)
+    id_to_idx = {comp_id: i for i, comp_id in enumerate(idx_to_id)}
+
+    indptr_out = array('i', [0])
+    indices_out = array('i')
+    indptr_in = array('i', [0])
+    indices_in = array('i')
+
+    for component in components.values():
+        indices_out.extend(id_to_idx[target_id] for target_id in component.connections_to)
+        indptr_out.append(len(indices_out))
+        indices_in.extend(id_to_idx[source_id] for source_id in component.connections_from)
+        indptr_in.append(len(indices_in))
+
+    return CSRGraph(indptr_out, indices_out, indptr_in, indices_in, id_to_idx, idx_to_id)
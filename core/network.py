@@ -1,121 +1,218 @@
-from typing import Dict, List, Set, Tuple, Optional
+import logging
+import sys
+from collections import defaultdict, deque
+from typing import Collection, Dict, Iterator, List, Set, Tuple, Optional
 from models.components import NetworkComponent
 from core.strahler import StrahlerAnalyzer
+from core.csr import CSRGraph, build_csr
+
+logger = logging.getLogger(__name__)
 
 class IrrigationNetwork:
     """Main class for managing irrigation network structure"""
     def __init__(self):
         self.components: Dict[str, NetworkComponent] = {}
+        # Component IDs by type, in insertion order
+        self._by_type: Dict[str, List[str]] = defaultdict(list)
         self._strahler_analyzer = StrahlerAnalyzer()
+        # Bumped on every topology edit; derived results are cached per version
+        self._topology_version: int = 0
+        self._cached_csr: Optional[Tuple[int, CSRGraph]] = None
+        self._cached_strahler: Optional[Tuple[int, Dict[str, int]]] = None
+        self._cached_levels: Optional[Tuple[int, Dict[int, List[str]]]] = None
+        self._cached_terminals: Optional[Tuple[int, List[str], List[str]]] = None
+        self._frozen_version: int = -1
 
     def add_component(self, id: str, label: str) -> NetworkComponent:
         """Add a new component to the network"""
-        print(f"Adding component: {id} ({label})")  # Debug print
+        logger.debug("Adding component: %s (%s)", id, label)
+        # Interned so every dict and connection holding this ID shares one
+        # string object and lookups can match it by identity
+        id = sys.intern(id)
         component = NetworkComponent(id=id, label=label)
+        if id not in self.components:
+            self._by_type[component.component_type].append(id)
         self.components[id] = component
+        self._topology_version += 1
         return component
 
     def add_connection(self, source_id: str, target_id: str):
         """Add a connection between components"""
-        print(f"Adding connection: {source_id} -> {target_id}")  # Debug print
-        if source_id in self.components and target_id in self.components:
-            self.components[source_id].add_connection_to(target_id)
-            self.components[target_id].add_connection_from(source_id)
-            print(f"Connection added between {source_id} and {target_id}")  # Debug print
+        logger.debug("Adding connection: %s -> %s", source_id, target_id)
+        source = self.components.get(source_id)
+        target = self.components.get(target_id)
+        if source is not None and target is not None:
+            # Store the components' own interned IDs, not the caller's copies
+            source.add_connection_to(target.id)
+            target.add_connection_from(source.id)
+            self._topology_version += 1
+            logger.debug("Connection added between %s and %s", source_id, target_id)
 
     def calculate_hierarchy_levels(self):
         """Calculate hierarchy levels using Strahler numbers"""
-        print("\nCalculating hierarchy levels...")  # Debug print
+        logger.debug("Calculating hierarchy levels...")
+        self.freeze()
         
         # Calculate Strahler numbers and use them as levels
-        strahler_numbers = self._strahler_analyzer.analyze_network(self.components)
+        strahler_numbers = self.get_strahler_order()
         
         # Update component levels based on Strahler numbers
+        components = self.components
         for comp_id, strahler in strahler_numbers.items():
-            print(f"Setting {comp_id} to level {strahler}")  # Debug print
-            self.components[comp_id].set_level(strahler)
+            logger.debug("Setting %s to level %s", comp_id, strahler)
+            components[comp_id].set_level(strahler)
+
+        # Log final hierarchy
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Final hierarchy:")
+            for comp_id, comp in self.components.items():
+                logger.debug("%s: Level %s", comp_id, comp.level)
+
+    def freeze(self):
+        """Convert every component's connection lists to tuples after the last add_connection"""
+        if self._frozen_version != self._topology_version:
+            for component in self.components.values():
+                component.freeze()
+            self._frozen_version = self._topology_version
 
-        # Print final hierarchy
-        print("\nFinal hierarchy:")
-        for comp_id, comp in self.components.items():
-            print(f"{comp_id}: Level {comp.level}")
+    def build_csr(self) -> CSRGraph:
+        """Build CSR adjacency arrays (indptr/indices, both directions) for bulk analysis"""
+        if self._cached_csr is None or self._cached_csr[0] != self._topology_version:
+            self._cached_csr = (self._topology_version, build_csr(self.components))
+        return self._cached_csr[1]
 
     def get_components_by_level(self) -> Dict[int, List[str]]:
         """Get components organized by hierarchy level"""
-        return self._strahler_analyzer.get_level_components(self.components)
+        if self._cached_levels is None or self._cached_levels[0] != self._topology_version:
+            self.get_strahler_order()
+            levels = self._strahler_analyzer.get_level_components(self.components)
+            self._cached_levels = (self._topology_version, levels)
+        return self._cached_levels[1]
+
+    def get_components_of_type(self, component_type: str) -> List[str]:
+        """Get IDs of all components of the given type, in insertion order"""
+        return self._by_type.get(component_type, [])
+
+    def get_type_counts(self) -> Dict[str, int]:
+        """Get the number of components of each type, in first-seen type order"""
+        return {comp_type: len(comp_ids) for comp_type, comp_ids in self._by_type.items() if comp_ids}
 
-    def get_component_children(self, component_id: str) -> List[str]:
+    def get_component_children(self, component_id: str) -> Collection[str]:
         """Get all immediate children of a component"""
-        if component_id in self.components:
-            return self.components[component_id].connections_to
-        return []
+        component = self.components.get(component_id)
+        return component.connections_to if component is not None else []
 
-    def get_component_parents(self, component_id: str) -> List[str]:
+    def get_component_parents(self, component_id: str) -> Collection[str]:
         """Get all immediate parents of a component"""
-        if component_id in self.components:
-            return self.components[component_id].connections_from
-        return []
+        component = self.components.get(component_id)
+        return component.connections_from if component is not None else []
 
     def get_all_paths(self, start_id: str, end_id: str = None) -> List[List[str]]:
         """Get all possible paths from start to end (or all paths from start if end is None)"""
-        paths = []
-        visited = set()
+        return list(self.iter_paths(start_id, end_id))
 
-        def dfs(current: str, path: List[str]):
-            if current in visited:
+    def iter_paths(self, start_id: str, end_id: str = None) -> Iterator[List[str]]:
+        """Lazily yield the paths of get_all_paths, so callers can stop at the first match"""
+        if start_id not in self.components:
+            return
+
+        # Search over integer node indices, converting to IDs only for results
+        csr = self.build_csr()
+        indptr, indices, idx_to_id = csr.indptr_out, csr.indices_out, csr.idx_to_id
+        start = csr.id_to_idx[start_id]
+        end = csr.id_to_idx.get(end_id, -1)
+        on_path = bytearray(len(idx_to_id))
+        path: List[int] = []  # Shared by the whole search, extended and unwound in place
+
+        if end_id is None:
+            productive = bytearray(b'\x01') * len(idx_to_id)
+        else:
+            # Only nodes upstream of the target can lie on a path to it,
+            # so collect them with a reverse BFS and prune everything else
+            if end < 0:
                 return
-            visited.add(current)
-            path.append(current)
-            
-            if end_id is None and not self.components[current].connections_to:
-                # End reached (leaf node)
-                paths.append(path.copy())
-            elif current == end_id:
-                # End reached (specific target)
-                paths.append(path.copy())
-            else:
-                for next_id in self.components[current].connections_to:
-                    dfs(next_id, path.copy())
-            
-            visited.remove(current)
+            productive = bytearray(len(idx_to_id))
+            productive[end] = 1
+            indptr_in, indices_in = csr.indptr_in, csr.indices_in
+            queue = deque([end])
+            while queue:
+                node = queue.popleft()
+                for parent in indices_in[indptr_in[node]:indptr_in[node + 1]]:
+                    if not productive[parent]:
+                        productive[parent] = 1
+                        queue.append(parent)
 
-        if start_id in self.components:
-            dfs(start_id, [])
-        
-        return paths
+        # Explicit DFS stack of child iterators, one level deeper than path
+        stack = [iter((start,))]
+        while stack:
+            for node in stack[-1]:
+                if on_path[node] or not productive[node]:
+                    continue
+                on_path[node] = 1
+                path.append(node)
+                
+                first, last = indptr[node], indptr[node + 1]
+                if node == end or (end_id is None and first == last):
+                    # End reached (specific target or leaf node)
+                    yield [idx_to_id[i] for i in path]
+                    stack.append(iter(()))
+                else:
+                    stack.append(iter(indices[first:last]))
+                break
+            else:
+                stack.pop()
+                if path:
+                    on_path[path.pop()] = 0
 
     def validate_network(self) -> Tuple[bool, List[str]]:
         """Validate the network structure"""
-        errors = []
-        
+        errors = list(self._iter_validation_errors())
+        return len(errors) == 0, errors
+
+    def is_valid(self) -> bool:
+        """Check the network structure, stopping at the first error"""
+        return next(self._iter_validation_errors(), None) is None
+
+    def _iter_validation_errors(self) -> Iterator[str]:
+        """Yield validate_network's error messages one at a time"""
         # Check for disconnected components
         for comp_id, component in self.components.items():
             if not component.connections_to and not component.connections_from:
-                errors.append(f"Component {comp_id} is disconnected from the network")
+                yield f"Component {comp_id} is disconnected from the network"
         
         # Validate distribution points (without root assumptions)
-        for comp_id, component in self.components.items():
-            if comp_id.startswith('DP'):
-                # Check if this DP is not a source node
-                if not component.connections_from and component.connections_to:
-                    errors.append(f"Distribution point {comp_id} has no input connection")
-
-        return len(errors) == 0, errors
+        for comp_id in self.get_components_of_type('distribution_point'):
+            component = self.components[comp_id]
+            # Check if this DP is not a source node
+            if not component.connections_from and component.connections_to:
+                yield f"Distribution point {comp_id} has no input connection"
         
     def get_strahler_order(self) -> Dict[str, int]:
         """Calculate Strahler numbers for each component"""
-        return self._strahler_analyzer.analyze_network(self.components)
+        if self._cached_strahler is None or self._cached_strahler[0] != self._topology_version:
+            strahler_numbers = self._strahler_analyzer.analyze_csr(self.build_csr())
+            self._cached_strahler = (self._topology_version, strahler_numbers)
+        return self._cached_strahler[1]
 
     def get_source_nodes(self) -> List[str]:
         """Get all source nodes (nodes with no incoming connections)"""
-        return [comp_id for comp_id, comp in self.components.items() 
-                if not comp.connections_from]
+        return self._get_terminals()[1]
                 
     def get_sink_nodes(self) -> List[str]:
         """Get all sink nodes (nodes with no outgoing connections)"""
-        return [comp_id for comp_id, comp in self.components.items() 
-                if not comp.connections_to]
+        return self._get_terminals()[2]
+
+    def _get_terminals(self) -> Tuple[int, List[str], List[str]]:
+        """Get (version, sources, sinks) from the CSR degrees, cached per topology version"""
+        if self._cached_terminals is None or self._cached_terminals[0] != self._topology_version:
+            csr = self.build_csr()
+            idx_to_id = csr.idx_to_id
+            self._cached_terminals = (self._topology_version,
+                                      [idx_to_id[node] for node in csr.sources()],
+                                      [idx_to_id[node] for node in csr.sinks()])
+        return self._cached_terminals
 
     def get_max_level(self) -> int:
         """Get the maximum hierarchy level in the network"""
+        self.get_strahler_order()
         return self._strahler_analyzer.get_max_level()
\ No newline at end of file
@@ -1,18 +1,60 @@
-from typing import List, Dict, Set, Optional
+from typing import Any, Callable, Iterable, Iterator, List, Dict, Set, Optional, Tuple
+import logging
 import re
+from array import array
+from collections import defaultdict
 from core.network import IrrigationNetwork
 from models.components import NetworkComponent
 
+logger = logging.getLogger(__name__)
+
+# Field IDs like F1_1, F2_2, etc.
+_FIELD_RE = re.compile(r'F\d+_\d+\Z')
+_DIGITS_RE = re.compile(r'(\d+)')
+
+
+def _id_sort_key(comp_id: str) -> tuple:
+    """Natural sort key for component IDs, so F2_3 sorts before F10_3"""
+    parts = _DIGITS_RE.split(comp_id)
+    parts[1::2] = map(int, parts[1::2])
+    return tuple(parts)
+
+
+def _format_strahler_numbers(strahler_numbers: Dict[str, int]) -> Iterator[str]:
+    """Format Step 3 results as 'component: order' lines"""
+    return (f"{comp_id}: {order}" for comp_id, order in strahler_numbers.items())
+
+
+def _format_top_path(paths: List[List[str]]) -> Iterator[str]:
+    """Format the Step 4 top level path"""
+    return (" -> ".join(path) for path in paths)
+
+
+def _format_main_paths(paths: List[List[str]]) -> Iterator[str]:
+    """Format Step 5 paths under a section header"""
+    yield "=== Main Paths from Top Level ==="
+    for path in paths:
+        yield " → ".join(path)
+
 
 class AnalysisStep:
     """Represents a single step in the network analysis process"""
     
-    def __init__(self, step_number: int, description: str, components: List, requires_approval: bool = False):
+    def __init__(self, step_number: int, description: str, components: List, requires_approval: bool = False,
+                 formatter: Optional[Callable[[Any], Iterable[str]]] = None):
         self.step_number = step_number
         self.description = description
         self.components = components
         self.requires_approval = requires_approval
         self.approved = False
+        self._formatter = formatter
+
+    @property
+    def formatted_components(self) -> Iterator[str]:
+        """Display strings for the components, built only when a view asks for them"""
+        if self._formatter is None:
+            return (str(component) for component in self.components)
+        return iter(self._formatter(self.components))
 
 
 class NetworkAnalyzer:
@@ -22,39 +64,48 @@ class NetworkAnalyzer:
         self.network: Optional[IrrigationNetwork] = None
         self.strahler_numbers: Dict[str, int] = {}
         self.analysis_steps: List[AnalysisStep] = []
+        # (network, topology version, binned components) of the last Step 1 run
+        self._cached_type_bins: Optional[Tuple[IrrigationNetwork, int, List[Dict]]] = None
     
     def analyze_network(self, network: IrrigationNetwork) -> List[AnalysisStep]:
         """Perform complete network analysis"""
-        print("Starting network analysis...")
+        logger.debug("Starting network analysis...")
         self.network = network
+        self.network.freeze()
+        # Steps are appended in order, so analysis_steps[i] is always step i + 1
         self.analysis_steps = []
         
         # Step 1: Component type analysis
         type_stats = self._analyze_component_types()
         self.analysis_steps.append(AnalysisStep(1, "Component Type Analysis", type_stats))
-        print("Step 1 completed:", type_stats)
+        logger.debug("Step 1 completed: %s", type_stats)
         
         # Step 2: Connection analysis
         connection_count = self._analyze_connections()
         self.analysis_steps.append(AnalysisStep(2, "Connection Analysis", [f"Found {connection_count} connections"]))
-        print("Step 2 completed:", f"Found {connection_count} connections")
+        logger.debug("Step 2 completed: Found %s connections", connection_count)
         
         # Step 3: Calculate Strahler numbers
         self.strahler_numbers = self._calculate_strahler_numbers()
-        strahler_results = [f"{comp_id}: {order}" for comp_id, order in self.strahler_numbers.items()]
-        self.analysis_steps.append(AnalysisStep(3, "Network Hierarchy Analysis", strahler_results))
-        print("Step 3 completed: Strahler numbers calculated")
-        print("Strahler numbers calculated:", self.strahler_numbers)
+        self.analysis_steps.append(AnalysisStep(
+            3,
+            "Network Hierarchy Analysis",
+            self.strahler_numbers,
+            formatter=_format_strahler_numbers
+        ))
+        logger.debug("Step 3 completed: Strahler numbers calculated")
+        logger.debug("Strahler numbers calculated: %s", self.strahler_numbers)
         
         # Step 4: Find top level path
         top_path = self._find_top_level_path()
         self.analysis_steps.append(AnalysisStep(
             4,
             "Top Level Path Identification",
-            [" -> ".join(top_path)],
-            requires_approval=True
+            [top_path],
+            requires_approval=True,
+            formatter=_format_top_path
         ))
-        print("Step 4 completed:", f"Found top level path: {' -> '.join(top_path)}")
+        logger.debug("Step 4 completed: Found top level path: %s", top_path)
         
         # Step 5: Initialize path analysis (updated after Step 4 approval)
         self.analysis_steps.append(AnalysisStep(
@@ -63,28 +114,24 @@ class NetworkAnalyzer:
             ["Waiting for Step 4 approval..."],
             requires_approval=True
         ))
-        print("Step 5 skipped: Top level not yet approved")
+        logger.debug("Step 5 skipped: Top level not yet approved")
         
         return self.analysis_steps
 
-    def _preprocess_fields(self) -> Dict[str, Dict]:
-        """Read the fields from Fields and Canals table"""
-        fields = {}
-        for comp_id, component in self.network.components.items():
-            # Use regex to match field IDs like F1_1, F2_2, etc.
-            if re.match(r'F\d+_\d+$', comp_id):
-                fields[comp_id] = {
-                    'id': comp_id,
-                    'type': 'field',
-                    'label': comp_id,
-                    'component': component
-                }
-                print(f"DEBUG: Found field {comp_id}")
-        return fields
-
     def _analyze_component_types(self) -> List[Dict]:
         """Analyze and get detailed component type information"""
-        components_by_type = {}
+        version = self.network._topology_version
+        cached = self._cached_type_bins
+        if cached is not None and cached[0] is self.network and cached[1] == version:
+            return cached[2]
+        
+        result = self._bin_component_types()
+        self._cached_type_bins = (self.network, version, result)
+        return result
+
+    def _bin_component_types(self) -> List[Dict]:
+        """Group components by type, each group sorted by ID"""
+        components_by_type: Dict[str, List[Dict]] = defaultdict(list)
         
         # Pre-define order and display names
         type_order = [
@@ -95,18 +142,12 @@ class NetworkAnalyzer:
             ('field', 'Field')
         ]
         
-        # First get all fields
-        fields = self._preprocess_fields()
-        print(f"\nDEBUG: Total fields found: {len(fields)}")
-        components_by_type['field'] = []
-        
-        # Process each component
+        # Single pass: fields (F1_1, F2_2, ...) are recognised by ID, everything
+        # else is binned by its component type
+        fields = components_by_type['field']
         for comp_id, component in self.network.components.items():
-            # If it's a field, handle it specially
-            if comp_id in fields:
-                if 'field' not in components_by_type:
-                    components_by_type['field'] = []
-                components_by_type['field'].append({
+            if _FIELD_RE.match(comp_id):
+                fields.append({
                     'id': comp_id,
                     'type': 'field',
                     'label': comp_id
@@ -115,70 +156,41 @@ class NetworkAnalyzer:
                 
             # Handle non-field components
             comp_type = component.component_type
-            if comp_type not in components_by_type:
-                components_by_type[comp_type] = []
-                
             components_by_type[comp_type].append({
                 'id': comp_id,
                 'type': comp_type,
                 'label': component.label
             })
+        logger.debug("Total fields found: %s", len(fields))
         
         # Debug output
-        print("\nDEBUG: Component counts:")
-        for comp_type, components in components_by_type.items():
-            print(f"{comp_type}: {len(components)} components")
-            if comp_type == 'field':
-                print("Field IDs:", sorted([comp['id'] for comp in components]))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Component counts:")
+            for comp_type, components in components_by_type.items():
+                logger.debug("%s: %s components", comp_type, len(components))
+                if comp_type == 'field':
+                    logger.debug("Field IDs: %s", sorted([comp['id'] for comp in components]))
         
         # Build results in the correct order
         result = []
+        # sorted() evaluates the key once per record, so IDs are parsed only once
         for comp_type, display_name in type_order:
             if comp_type in components_by_type:
-                components = sorted(components_by_type[comp_type], key=lambda x: x['id'])
+                components = sorted(components_by_type[comp_type], key=lambda x: _id_sort_key(x['id']))
                 result.extend(components)
         
         return result
 
     def _analyze_connections(self) -> int:
         """Count and validate network connections"""
-        connection_count = 0
-        for component in self.network.components.values():
-            connection_count += len(component.connections_to)
-        return connection_count
+        # The CSR row pointer already ends at the edge count; the same cached
+        # CSR is reused by the Strahler analysis in Step 3
+        return self.network.build_csr().indptr_out[-1]
     
     def _calculate_strahler_numbers(self) -> Dict[str, int]:
         """Calculate Strahler numbers for network components"""
-        strahler_numbers: Dict[str, int] = {}
-        
-        def calculate_strahler(node_id: str) -> int:
-            if node_id in strahler_numbers:
-                return strahler_numbers[node_id]
-            
-            component = self.network.components[node_id]
-            
-            if not component.connections_to:
-                strahler_numbers[node_id] = 1
-                print(f"Leaf node {node_id} assigned order 1")
-                return 1
-            
-            child_numbers = [calculate_strahler(child) for child in component.connections_to]
-            
-            max_child = max(child_numbers)
-            if child_numbers.count(max_child) > 1:
-                strahler_numbers[node_id] = max_child + 1
-                print(f"Node {node_id} has {child_numbers.count(max_child)} children of order {max_child}, assigned order {max_child + 1}")
-            else:
-                strahler_numbers[node_id] = max_child
-                print(f"Node {node_id} has highest child order {max_child}, keeping same order")
-            
-            return strahler_numbers[node_id]
-        
-        for comp_id in self.network.components:
-            if comp_id not in strahler_numbers:
-                calculate_strahler(comp_id)
-        
-        return strahler_numbers
+        # Shares the network's topological sweep and its per-topology cache
+        return self.network.get_strahler_order()
     
     def _find_top_level_path(self) -> List[str]:
         """Find the main path from root to first major distribution point"""
@@ -187,18 +199,20 @@ class NetworkAnalyzer:
         
         path = [self.network.root_id]
         current = self.network.root_id
+        components = self.network.components
+        strahler_numbers = self.strahler_numbers
         
         while True:
-            component = self.network.components[current]
+            component = components[current]
             next_components = [
                 next_id for next_id in component.connections_to
-                if next_id in self.strahler_numbers
+                if next_id in strahler_numbers
             ]
             
             if not next_components:
                 break
                 
-            next_id = max(next_components, key=lambda x: self.strahler_numbers[x])
+            next_id = max(next_components, key=strahler_numbers.__getitem__)
             path.append(next_id)
             current = next_id
             
@@ -209,67 +223,77 @@ class NetworkAnalyzer:
     
     def _analyze_paths(self) -> None:
         """Analyze paths from top level through the network hierarchy"""
-        if not any(step.step_number == 4 and step.approved for step in self.analysis_steps):
-            print("Step 5 skipped: Top level not yet approved")
+        # analysis_steps[i] is step i + 1, see analyze_network
+        if len(self.analysis_steps) < 5 or not self.analysis_steps[3].approved:
+            logger.debug("Step 5 skipped: Top level not yet approved")
             return
         
         # Get the approved top-level path
-        top_level_step = next((step for step in self.analysis_steps 
-                             if step.step_number == 4 and step.approved), None)
-        if not top_level_step or not top_level_step.components:
+        top_level_step = self.analysis_steps[3]
+        assert top_level_step.step_number == 4
+        if not top_level_step.components or not top_level_step.components[0]:
             return
         
         # Extract the root path components
-        root_path = top_level_step.components[0].split(" -> ")
+        root_path = top_level_step.components[0]
         root_id = root_path[0]  # Should be DP0
-        print(f"Starting path analysis from: {' -> '.join(root_path)}")
+        logger.debug("Starting path analysis from: %s", root_path)
         
-        all_paths = []
-        visited = set()
+        # Paths are stored CSR-style: path i is path_nodes[path_offsets[i]:path_offsets[i + 1]]
+        path_nodes = array('i')
+        path_offsets = array('i', [0])
+        csr = self.network.build_csr()
+        indptr, indices, idx_to_id = csr.indptr_out, csr.indices_out, csr.idx_to_id
+        on_path = bytearray(len(idx_to_id))
         
-        def find_paths(start_id: str, current_path: List[str]):
-            """Recursively find all paths from the given start point"""
-            if start_id in visited:
-                return
-                
-            visited.add(start_id)
-            current_path.append(start_id)
-            
-            component = self.network.components[start_id]
-            if not component.connections_to:  # End point reached
-                all_paths.append(current_path.copy())
+        # Depth-first walk with an explicit stack of child iterators, so deep
+        # networks do not run into the recursion limit
+        root = csr.id_to_idx[root_id]
+        logger.debug("Finding paths from root: %s", root_id)
+        current_path = [root]  # Shared path, extended and unwound while backtracking
+        on_path[root] = 1
+        stack = [iter(indices[indptr[root]:indptr[root + 1]])]
+        if indptr[root] == indptr[root + 1]:  # Root is already an end point
+            path_nodes.extend(current_path)
+            path_offsets.append(len(path_nodes))
+        while stack:
+            for next_node in stack[-1]:
+                if on_path[next_node]:
+                    continue
+                first, last = indptr[next_node], indptr[next_node + 1]
+                if first == last:  # End point reached
+                    path_nodes.extend(current_path)
+                    path_nodes.append(next_node)
+                    path_offsets.append(len(path_nodes))
+                    continue
+                on_path[next_node] = 1
+                current_path.append(next_node)
+                stack.append(iter(indices[first:last]))
+                break
             else:
-                for next_id in component.connections_to:
-                    if next_id not in visited:
-                        find_paths(next_id, current_path.copy())
-            
-            visited.remove(start_id)
-        
-        # Find all paths starting from root
-        print(f"Finding paths from root: {root_id}")
-        find_paths(root_id, [])
-        
-        # Sort paths by length and format for display
-        sorted_paths = sorted(all_paths, key=len)
-        formatted_paths = []
+                stack.pop()
+                on_path[current_path.pop()] = 0
         
-        # Add main paths section
-        formatted_paths.append("=== Main Paths from Top Level ===")
+        # Sort paths by length, joining them into strings is left to display time
+        path_count = len(path_offsets) - 1
+        sorted_paths = sorted(range(path_count),
+                              key=lambda i: path_offsets[i + 1] - path_offsets[i])
+        main_paths = []
         
-        # Add paths that extend beyond the top level
-        for path in sorted_paths:
-            if len(path) > len(root_path):  # Only show paths longer than root path
-                formatted_paths.append(" → ".join(path))
+        # Keep paths that extend beyond the top level
+        for i in sorted_paths:
+            first, last = path_offsets[i], path_offsets[i + 1]
+            if last - first > len(root_path):  # Only show paths longer than root path
+                main_paths.append([idx_to_id[node] for node in path_nodes[first:last]])
         
         # Update Step 5
-        step5_index = next(i for i, step in enumerate(self.analysis_steps) 
-                         if step.step_number == 5)
-        
-        self.analysis_steps[step5_index] = AnalysisStep(
+        assert self.analysis_steps[4].step_number == 5
+        self.analysis_steps[4] = AnalysisStep(
             step_number=5,
             description="Complete Network Path Analysis",
-            components=formatted_paths,
-            requires_approval=True
+            components=main_paths,
+            requires_approval=True,
+            formatter=_format_main_paths
         )
         
-        print(f"Step 5 completed: Found {len(formatted_paths) - 1} paths")
\ No newline at end of file
+        logger.debug("Step 5 completed: Found %s paths", len(main_paths))
\ No newline at end of file
@@ -1,6 +1,9 @@
 # core/strahler.py
-from typing import Dict, Set, List
+from collections import deque
+from typing import Dict, Set, List, Optional
 from models.components import NetworkComponent
+from core.csr import CSRGraph, build_csr
+from core import _strahler_numba
 
 class StrahlerAnalyzer:
     """
@@ -9,10 +12,13 @@ class StrahlerAnalyzer:
     about specific component types or predefined hierarchies.
     """
     
-    def __init__(self):
+    def __init__(self, use_numba: bool = True):
+        # Use the compiled sweep when Numba is installed
+        self.use_numba = use_numba
         self.strahler_numbers: Dict[str, int] = {}
         self.source_nodes: Set[str] = set()
         self.sink_nodes: Set[str] = set()
+        self._last_csr: Optional[CSRGraph] = None
         
     def analyze_network(self, components: Dict[str, NetworkComponent]) -> Dict[str, int]:
         """
@@ -24,71 +30,156 @@ class StrahlerAnalyzer:
         Returns:
             Dictionary mapping component IDs to their Strahler numbers
         """
-        self.strahler_numbers.clear()
-        self._identify_sources_and_sinks(components)
+        return self.analyze_csr(build_csr(components))
+    
+    def analyze_csr(self, csr: CSRGraph) -> Dict[str, int]:
+        """
+        Calculate Strahler numbers over a prebuilt CSR adjacency.
         
-        # Calculate Strahler numbers starting from each source
-        for source_id in self.source_nodes:
-            self._calculate_strahler(source_id, components, set())
+        Args:
+            csr: CSR adjacency of the network (see IrrigationNetwork.build_csr)
             
+        Returns:
+            Dictionary mapping component IDs to their Strahler numbers
+        """
+        # A cached CSR is rebuilt whenever the topology changes, so the same
+        # object means the previous results are still valid
+        if csr is self._last_csr:
+            return self.strahler_numbers
+        
+        self._identify_sources_and_sinks(csr)
+        
+        # -1 marks unvisited nodes, -2 nodes on the current DFS stack
+        strahler = [-1] * len(csr.idx_to_id)
+        order: List[int] = []
+        
+        # Resolve everything that is not affected by a cycle in one sweep
+        if self._sweep_strahler(csr, strahler, order) == len(strahler):
+            return self._to_component_ids(csr, strahler, order)
+        
+        # Calculate the remaining Strahler numbers starting from each source
+        for node in csr.sources():
+            self._calculate_strahler(node, csr, strahler, order)
+        
+        return self._to_component_ids(csr, strahler, order)
+    
+    def _to_component_ids(self, csr: CSRGraph, strahler: List[int],
+                          order: List[int]) -> Dict[str, int]:
+        """Map integer results back to component IDs in computation order"""
+        idx_to_id = csr.idx_to_id
+        self.strahler_numbers = {idx_to_id[node]: strahler[node] for node in order}
+        self._last_csr = csr
         return self.strahler_numbers
+    
+    def _sweep_strahler(self, csr: CSRGraph, strahler: List[int], order: List[int]) -> int:
+        """
+        Calculate Strahler numbers with a Kahn-style topological sweep from the sinks.
+        
+        Every node is popped from a single worklist exactly once, after all of its
+        children are resolved; its number is folded into the parents' running
+        maximum and count of that maximum. Nodes on or upstream of a cycle never
+        become ready and are left at -1.
         
-    def _identify_sources_and_sinks(self, components: Dict[str, NetworkComponent]):
+        Args:
+            csr: CSR adjacency of the network
+            strahler: Per-node Strahler numbers, filled in place
+            order: Receives node indices in the order they are computed
+            
+        Returns:
+            Number of nodes resolved by the sweep
+        """
+        if self.use_numba and _strahler_numba.HAVE_NUMBA:
+            strahler[:], resolved = _strahler_numba.sweep_strahler(csr)
+            order.extend(resolved)
+            return len(order)
+        
+        indptr_out = csr.indptr_out
+        indptr_in, indices_in = csr.indptr_in, csr.indices_in
+        n = len(strahler)
+        
+        remaining = [indptr_out[node + 1] - indptr_out[node] for node in range(n)]
+        max_child = [0] * n
+        max_count = [0] * n
+        ready = deque(node for node in range(n) if not remaining[node])
+        
+        while ready:
+            node = ready.popleft()
+            # Sinks have no children and get 1
+            number = max_child[node] + 1 if max_count[node] > 1 else max_child[node] or 1
+            strahler[node] = number
+            order.append(node)
+            
+            for parent in indices_in[indptr_in[node]:indptr_in[node + 1]]:
+                if number > max_child[parent]:
+                    max_child[parent] = number
+                    max_count[parent] = 1
+                elif number == max_child[parent]:
+                    max_count[parent] += 1
+                remaining[parent] -= 1
+                if not remaining[parent]:
+                    ready.append(parent)
+        
+        return len(order)
+        
+    def _identify_sources_and_sinks(self, csr: CSRGraph):
         """
         Identify source nodes (no incoming connections) and sink nodes (no outgoing connections).
         Updates source_nodes and sink_nodes sets.
         """
-        self.source_nodes.clear()
-        self.sink_nodes.clear()
-        
-        for comp_id, component in components.items():
-            if not component.connections_from:
-                self.source_nodes.add(comp_id)
-            if not component.connections_to:
-                self.sink_nodes.add(comp_id)
+        idx_to_id = csr.idx_to_id
+        self.source_nodes = {idx_to_id[node] for node in csr.sources()}
+        self.sink_nodes = {idx_to_id[node] for node in csr.sinks()}
     
-    def _calculate_strahler(self, node_id: str, components: Dict[str, NetworkComponent], 
-                          visited: Set[str]) -> int:
+    def _calculate_strahler(self, node: int, csr: CSRGraph, strahler: List[int],
+                            order: List[int]) -> int:
         """
-        Calculate Strahler number for a single node using DFS.
+        Calculate Strahler numbers for a node and everything downstream of it
+        using an iterative post-order DFS over the CSR arrays.
         
         Args:
-            node_id: ID of current node
-            components: Network components dictionary
-            visited: Set of visited node IDs to prevent cycles
+            node: Index of the starting node
+            csr: CSR adjacency of the network
+            strahler: Per-node Strahler numbers, negative where not yet computed
+            order: Receives node indices in the order they are computed
             
         Returns:
-            Strahler number for the current node
+            Strahler number for the starting node
         """
         # Return memoized result if available
-        if node_id in self.strahler_numbers:
-            return self.strahler_numbers[node_id]
-            
-        # Detect cycles
-        if node_id in visited:
-            return 0
-            
-        visited.add(node_id)
-        component = components[node_id]
-        
-        # Base case: sink nodes (no outgoing edges) have Strahler number 1
-        if not component.connections_to:
-            self.strahler_numbers[node_id] = 1
-            visited.remove(node_id)
-            return 1
-            
-        # Calculate Strahler numbers of all children
-        child_numbers = []
-        for child_id in component.connections_to:
-            child_number = self._calculate_strahler(child_id, components, visited)
-            child_numbers.append(child_number)
-            
-        # Calculate Strahler number based on children
-        strahler = self._compute_strahler_from_children(child_numbers)
-        self.strahler_numbers[node_id] = strahler
-        
-        visited.remove(node_id)
-        return strahler
+        if strahler[node] >= 0:
+            return strahler[node]
+        
+        indptr, indices = csr.indptr_out, csr.indices_out
+        
+        # Each stack entry pairs a node with an iterator over its children;
+        # results_stack collects the children's Strahler numbers in parallel.
+        stack = [(node, iter(indices[indptr[node]:indptr[node + 1]]))]
+        results_stack: List[List[int]] = [[]]
+        strahler[node] = -2
+        
+        while stack:
+            current, children = stack[-1]
+            for child in children:
+                if strahler[child] >= 0:
+                    results_stack[-1].append(strahler[child])
+                elif strahler[child] == -2:
+                    # Cycle detected, the back edge contributes nothing
+                    results_stack[-1].append(0)
+                else:
+                    strahler[child] = -2
+                    stack.append((child, iter(indices[indptr[child]:indptr[child + 1]])))
+                    results_stack.append([])
+                    break
+            else:
+                # All children processed (sinks have none and get 1)
+                stack.pop()
+                number = self._compute_strahler_from_children(results_stack.pop())
+                strahler[current] = number
+                order.append(current)
+                if results_stack:
+                    results_stack[-1].append(number)
+        
+        return strahler[node]
     
     def _compute_strahler_from_children(self, child_numbers: List[int]) -> int:
         """
@@ -103,12 +194,16 @@ class StrahlerAnalyzer:
         if not child_numbers:
             return 1
         
-        # Sort in descending order for efficient max finding
-        sorted_numbers = sorted(child_numbers, reverse=True)
-        max_number = sorted_numbers[0]
+        # Track the largest and second-largest numbers in a single pass
+        max_number = second_number = -1
+        for number in child_numbers:
+            if number > max_number:
+                max_number, second_number = number, max_number
+            elif number > second_number:
+                second_number = number
         
         # If multiple children have the max Strahler number, increment by 1
-        if len(sorted_numbers) > 1 and sorted_numbers[1] == max_number:
+        if second_number == max_number:
             return max_number + 1
             
         # Otherwise, use the maximum number
@@ -124,14 +219,12 @@ class StrahlerAnalyzer:
         Returns:
             Dictionary mapping Strahler numbers to lists of component IDs
         """
-        levels: Dict[int, List[str]] = {}
-        
+        # Strahler numbers are small, so bucket into a list indexed by level
+        buckets: List[List[str]] = [[] for _ in range(self.get_max_level() + 1)]
         for comp_id, strahler in self.strahler_numbers.items():
-            if strahler not in levels:
-                levels[strahler] = []
-            levels[strahler].append(comp_id)
+            buckets[strahler].append(comp_id)
             
-        return levels
+        return {level: comp_ids for level, comp_ids in enumerate(buckets) if comp_ids}
         
     def get_max_level(self) -> int:
         """
@@ -1,15 +1,93 @@
-from typing import List, Tuple, Dict, Set
+import re
+from array import array
+from collections import deque
+from itertools import compress
+from operator import ne
+from typing import List, Tuple, Dict, Set, Optional
 from core.network import IrrigationNetwork
 from core.strahler import StrahlerAnalyzer
+from core import _validator_numba
+
+# Everything but the letters of a component ID, whose letters form its
+# type prefix, e.g. 'DP' for DP1_2
+_NON_LETTER_RE = re.compile(r'[^A-Za-z]+')
+
+# Control points that must lie on every irrigation path to a field
+_CONTROL_TYPES = frozenset({'smart_water', 'gate'})
+
+# Valid connection patterns: component type -> allowed target types
+_VALID_CONNECTIONS = {
+    'canal': frozenset({'distribution_point', 'smart_water', 'gate'}),
+    'distribution_point': frozenset({'canal', 'smart_water', 'gate', 'field'}),
+    'smart_water': frozenset({'field'}),
+    'gate': frozenset({'field'}),
+    'field': frozenset()  # Fields should not have outgoing connections
+}
+
+# Expected component type for each ID prefix
+_TYPE_BY_PREFIX = {
+    'MC': 'canal',
+    'DP': 'distribution_point',
+    'SW': 'smart_water',
+    'ZT': 'gate',
+    'F': 'field'
+}
+
+# Message templates for the (code, args) records collected during validation
+_MESSAGES = {
+    'disconnected': "Component {0} is disconnected",
+    'no_sources': "Network has no source nodes",
+    'no_sinks': "Network has no sink nodes",
+    'cycle': "Cycle detected involving component {0}",
+    'level_mismatch': "Component {0} level ({1}) does not match its Strahler number ({2})",
+    'invalid_hierarchy': "Invalid hierarchy: {0} (level {1}) connects to {2} (level {3})",
+    'invalid_connection': "Invalid connection: {0} ({1}) to {2} ({3})",
+    'smart_water_inputs': "Smart water meter {0} should have exactly one input",
+    'smart_water_outputs': "Smart water meter {0} should have exactly one output",
+    'gate_inputs': "Gate {0} should have exactly one input",
+    'field_inputs': "Field {0} should have exactly one input",
+    'field_outputs': "Field {0} should not have any outputs",
+    'incorrect_type': "Component {0} has incorrect type {1}, expected {2}",
+    'no_field_path': "No valid irrigation path to field {0}",
+    'no_control_point': "Field {0} has no control point (smart water or gate) in its irrigation path",
+}
+
+def _render(code: str, args: tuple) -> str:
+    """Format a validation record as its message"""
+    return _MESSAGES[code].format(*args)
+
+def _level_mismatches(levels: array, strahler: array) -> List[int]:
+    """Indices of nodes whose level differs from their Strahler number"""
+    return list(compress(range(len(levels)), map(ne, levels, strahler)))
+
+def _hierarchy_violations(levels: array, indptr: array, indices: array) -> List[Tuple[int, int]]:
+    """(parent, child) index pairs where the child's level is not below the parent's"""
+    violations = []
+    for parent in range(len(levels)):
+        level = levels[parent]
+        for child in indices[indptr[parent]:indptr[parent + 1]]:
+            if levels[child] <= level and child != parent:
+                violations.append((parent, child))
+    return violations
 
 class NetworkValidator:
     """Validator for irrigation network structures"""
     
-    def __init__(self, network: IrrigationNetwork):
+    def __init__(self, network: IrrigationNetwork, use_numba: bool = True):
         self.network = network
-        self.errors: List[str] = []
-        self.warnings: List[str] = []
-        self.strahler_analyzer = StrahlerAnalyzer()
+        # (code, args) records, rendered to messages only when validate() returns
+        self.errors: List[Tuple[str, tuple]] = []
+        self.warnings: List[Tuple[str, tuple]] = []
+        self.use_numba = use_numba
+        self.strahler_analyzer = StrahlerAnalyzer(use_numba)
+        # Per-pass component lists, only set while validate() is running (see _collect_components)
+        self._sources: Optional[List[str]] = None
+        self._sinks: Optional[List[str]] = None
+        self._fields: Optional[List[str]] = None
+        self._disconnected: Optional[List[str]] = None
+        self._type_by_id: Optional[Dict[str, str]] = None
+        self._control_set: Optional[Set[str]] = None
+        self._has_cycle = False
     
     def validate(self) -> Tuple[bool, List[str], List[str]]:
         """
@@ -24,217 +102,228 @@ class NetworkValidator:
         self.errors = []
         self.warnings = []
         
-        # Run all validation checks
-        self._validate_topology()
-        self._validate_strahler_ordering()
-        self._validate_component_connections()
-        self._validate_component_types()
-        self._validate_field_paths()
-        self._validate_irrigation_rules()
+        self._collect_components()
+        
+        try:
+            # Run all validation checks
+            self._validate_topology()
+            self._validate_strahler_ordering()
+            self._validate_components()
+            self._validate_field_reachability()
+        finally:
+            self._sources = self._sinks = self._fields = self._disconnected = None
+            self._type_by_id = self._control_set = None
+            self._has_cycle = False
         
-        return len(self.errors) == 0, self.errors, self.warnings
+        return (len(self.errors) == 0,
+                [_render(*error) for error in self.errors],
+                [_render(*warning) for warning in self.warnings])
+    
+    def _collect_components(self):
+        """Collect sources, sinks, fields, disconnected components and types in one pass"""
+        self._sources = sources = []
+        self._sinks = sinks = []
+        self._fields = fields = []
+        self._disconnected = disconnected = []
+        self._type_by_id = type_by_id = {}
+        self._control_set = control_set = set()
+        
+        for comp_id, comp in self.network.components.items():
+            has_in = bool(comp.connections_from)
+            has_out = bool(comp.connections_to)
+            if not has_in:
+                sources.append(comp_id)
+                if not has_out:
+                    disconnected.append(comp_id)
+            if not has_out:
+                sinks.append(comp_id)
+            
+            # The component type already encodes the 'F' field prefix
+            comp_type = type_by_id[comp_id] = comp.component_type
+            if comp_type == 'field':
+                fields.append(comp_id)
+            elif comp_type in _CONTROL_TYPES:
+                control_set.add(comp_id)
     
     def _validate_topology(self):
         """Validate basic network topology"""
         # Check for disconnected components
-        for comp_id, comp in self.network.components.items():
-            if not comp.connections_from and not comp.connections_to:
-                self.errors.append(f"Component {comp_id} is disconnected")
+        for comp_id in self._disconnected:
+            self.errors.append(('disconnected', (comp_id,)))
         
         # Must have at least one source and one sink
-        sources = [comp_id for comp_id, comp in self.network.components.items() 
-                  if not comp.connections_from]
-        sinks = [comp_id for comp_id, comp in self.network.components.items() 
-                if not comp.connections_to]
-        
-        if not sources:
-            self.errors.append("Network has no source nodes")
-        if not sinks:
-            self.errors.append("Network has no sink nodes")
+        if not self._sources:
+            self.errors.append(('no_sources', ()))
+        if not self._sinks:
+            self.errors.append(('no_sinks', ()))
         
         # Check for cycles
         self._check_for_cycles()
     
     def _validate_strahler_ordering(self):
         """Validate Strahler number assignments and hierarchy"""
-        # Calculate Strahler numbers
-        strahler_numbers = self.strahler_analyzer.analyze_network(self.network.components)
+        # Calculate Strahler numbers on the network's cached CSR arrays
+        csr = self.network.build_csr()
+        strahler_numbers = self.strahler_analyzer.analyze_csr(csr)
+        
+        ids = csr.idx_to_id
+        components = self.network.components
+        levels = array('i', [components[comp_id].level for comp_id in ids])
+        strahler = array('i', [strahler_numbers.get(comp_id, -1) for comp_id in ids])
+        
+        if self.use_numba and _validator_numba.HAVE_NUMBA:
+            level_mismatches = _validator_numba.level_mismatches
+            hierarchy_violations = _validator_numba.hierarchy_violations
+        else:
+            level_mismatches = _level_mismatches
+            hierarchy_violations = _hierarchy_violations
         
         # Validate component levels match Strahler numbers
-        for comp_id, comp in self.network.components.items():
-            strahler = strahler_numbers.get(comp_id, -1)
-            if comp.level != strahler:
-                self.errors.append(
-                    f"Component {comp_id} level ({comp.level}) does not match "
-                    f"its Strahler number ({strahler})")
+        for node in level_mismatches(levels, strahler):
+            self.errors.append(('level_mismatch', (ids[node], levels[node], strahler[node])))
         
         # Validate level relationships
-        for comp_id, comp in self.network.components.items():
-            for child_id in comp.connections_to:
-                child = self.network.components[child_id]
-                if child.level <= comp.level and child_id != comp_id:
-                    self.errors.append(
-                        f"Invalid hierarchy: {comp_id} (level {comp.level}) connects to "
-                        f"{child_id} (level {child.level})")
+        for parent, child in hierarchy_violations(levels, csr.indptr_out, csr.indices_out):
+            self.errors.append(
+                ('invalid_hierarchy', (ids[parent], levels[parent], ids[child], levels[child])))
     
-    def _validate_component_connections(self):
-        """Validate connections between components"""
-        # Define valid connection patterns
-        valid_connections = {
-            'canal': {'distribution_point', 'smart_water', 'gate'},
-            'distribution_point': {'canal', 'smart_water', 'gate', 'field'},
-            'smart_water': {'field'},
-            'gate': {'field'},
-            'field': set()  # Fields should not have outgoing connections
-        }
-        
+    def _validate_components(self):
+        """Validate each component's connections, type rules and ID prefix in one pass"""
+        type_by_id = self._type_by_id
+        # Prefix errors are reported after all connection errors, as when
+        # they were checked in a separate pass
+        type_errors = []
         for comp_id, comp in self.network.components.items():
-            comp_type = comp.component_type
+            comp_type = type_by_id[comp_id]
             
             # Validate outgoing connections
-            if comp_type in valid_connections:
-                allowed_targets = valid_connections[comp_type]
+            allowed_targets = _VALID_CONNECTIONS.get(comp_type)
+            if allowed_targets is not None:
                 for target_id in comp.connections_to:
-                    target_type = self.network.components[target_id].component_type
+                    target_type = type_by_id[target_id]
                     if target_type not in allowed_targets:
                         self.errors.append(
-                            f"Invalid connection: {comp_id} ({comp_type}) to "
-                            f"{target_id} ({target_type})")
+                            ('invalid_connection', (comp_id, comp_type, target_id, target_type)))
             
             # Component-specific validations
-            self._validate_component_specific_rules(comp_id, comp)
+            self._validate_component_specific_rules(comp_id, comp, comp_type)
+            
+            # Validate component type assignment against the ID prefix
+            expected_type = _TYPE_BY_PREFIX.get(_NON_LETTER_RE.sub('', comp_id))
+            if expected_type is not None and comp_type != expected_type:
+                type_errors.append(('incorrect_type', (comp_id, comp_type, expected_type)))
+        
+        self.errors.extend(type_errors)
     
-    def _validate_component_specific_rules(self, comp_id: str, comp):
+    def _validate_component_specific_rules(self, comp_id: str, comp, comp_type: str):
         """Validate rules specific to each component type"""
-        if comp.component_type == 'smart_water':
+        if comp_type == 'smart_water':
             # Smart water meters should have exactly one input and one output
             if len(comp.connections_from) != 1:
-                self.errors.append(
-                    f"Smart water meter {comp_id} should have exactly one input")
+                self.errors.append(('smart_water_inputs', (comp_id,)))
             if len(comp.connections_to) != 1:
-                self.errors.append(
-                    f"Smart water meter {comp_id} should have exactly one output")
+                self.errors.append(('smart_water_outputs', (comp_id,)))
                 
-        elif comp.component_type == 'gate':
+        elif comp_type == 'gate':
             # Gates should have exactly one input
             if len(comp.connections_from) != 1:
-                self.errors.append(f"Gate {comp_id} should have exactly one input")
+                self.errors.append(('gate_inputs', (comp_id,)))
                 
-        elif comp.component_type == 'field':
+        elif comp_type == 'field':
             # Fields should have exactly one input and no outputs
             if len(comp.connections_from) != 1:
-                self.errors.append(f"Field {comp_id} should have exactly one input")
+                self.errors.append(('field_inputs', (comp_id,)))
             if comp.connections_to:
-                self.errors.append(f"Field {comp_id} should not have any outputs")
+                self.errors.append(('field_outputs', (comp_id,)))
     
-    def _validate_component_types(self):
-        """Validate component type assignments"""
-        valid_prefixes = {
-            'MC': 'canal',
-            'DP': 'distribution_point',
-            'SW': 'smart_water',
-            'ZT': 'gate',
-            'F': 'field'
-        }
-        
-        for comp_id, comp in self.network.components.items():
-            prefix = ''.join(c for c in comp_id if c.isalpha())
-            if prefix in valid_prefixes:
-                expected_type = valid_prefixes[prefix]
-                if comp.component_type != expected_type:
-                    self.errors.append(
-                        f"Component {comp_id} has incorrect type {comp.component_type}, "
-                        f"expected {expected_type}")
-    
-    def _validate_field_paths(self):
-        """Validate paths to fields"""
-        fields = [comp_id for comp_id in self.network.components 
-                 if comp_id.startswith('F')]
-                 
-        for field_id in fields:
-            # Find paths from all sources to this field
-            sources = [comp_id for comp_id, comp in self.network.components.items() 
-                      if not comp.connections_from]
-            
-            valid_path_found = False
-            for source_id in sources:
-                paths = self.network.get_all_paths(source_id, field_id)
-                if any(self._is_valid_field_path(path) for path in paths):
-                    valid_path_found = True
-                    break
-            
-            if not valid_path_found:
-                self.errors.append(f"No valid irrigation path to field {field_id}")
-    
-    def _validate_irrigation_rules(self):
-        """Validate irrigation-specific business rules"""
-        # Fields should have control points in their paths
-        fields = [comp_id for comp_id in self.network.components 
-                 if comp_id.startswith('F')]
-                 
-        for field_id in fields:
-            if not self._has_control_point_in_path(field_id):
-                self.warnings.append(
-                    f"Field {field_id} has no control point (smart water or gate) "
-                    "in its irrigation path")
+    def _validate_field_reachability(self):
+        """Validate paths to fields and the irrigation rule that they pass a control point"""
+        if self._has_cycle:
+            # The sweep follows walks, which on a cyclic network can loop back
+            # through a control point that no simple path to the field passes
+            fed = self._fed_through_control_point_on_paths()
+        else:
+            # One sweep over the network answers both checks for every field
+            fed = self._fed_through_control_point()
+        for field_id in self._fields:
+            if field_id not in fed:
+                self.errors.append(('no_field_path', (field_id,)))
+                self.warnings.append(('no_control_point', (field_id,)))
     
     def _check_for_cycles(self):
         """Check for cycles in the network"""
-        visited = set()
-        path = set()
-        
-        def detect_cycle(node_id: str) -> bool:
-            if node_id in path:
-                self.errors.append(f"Cycle detected involving component {node_id}")
-                return True
-                
-            if node_id in visited:
-                return False
-                
-            visited.add(node_id)
-            path.add(node_id)
-            
-            component = self.network.components[node_id]
-            for next_id in component.connections_to:
-                if detect_cycle(next_id):
-                    return True
-                    
-            path.remove(node_id)
-            return False
+        # 0 = unvisited, 1 = on the DFS stack, 2 = fully explored
+        color = dict.fromkeys(self.network.components, 0)
+        components = self.network.components
+        reported = set()  # Components already named in a cycle error
         
         # Start from source nodes
-        sources = [comp_id for comp_id, comp in self.network.components.items() 
-                  if not comp.connections_from]
-                  
-        for source_id in sources:
-            detect_cycle(source_id)
-    
-    def _is_valid_field_path(self, path: List[str]) -> bool:
-        """Check if a path to a field contains necessary components"""
-        if not path:
-            return False
-            
-        # Must end with a field
-        if not path[-1].startswith('F'):
-            return False
+        for source_id in self._sources:
+            if color[source_id]:
+                continue
+            color[source_id] = 1
+            stack = [(source_id, iter(components[source_id].connections_to))]
             
-        # Must have at least one control point
-        has_control = any(
-            self.network.components[node_id].component_type in ['smart_water', 'gate']
-            for node_id in path
-        )
+            while stack:
+                node_id, children = stack[-1]
+                for next_id in children:
+                    state = color[next_id]
+                    if state == 1:
+                        self._has_cycle = True
+                        if next_id not in reported:
+                            reported.add(next_id)
+                            self.errors.append(('cycle', (next_id,)))
+                    elif state == 0:
+                        color[next_id] = 1
+                        stack.append((next_id, iter(components[next_id].connections_to)))
+                        break
+                else:
+                    color[node_id] = 2
+                    stack.pop()
+    
+    def _fed_through_control_point(self) -> Set[str]:
+        """
+        IDs of components that some source reaches through a control point
+        
+        Propagates (node, seen control) states forward from every source at
+        once, so one O(V+E) sweep answers the check for all fields.
+        """
+        csr = self.network.build_csr()
+        indptr, indices, idx_to_id = csr.indptr_out, csr.indices_out, csr.idx_to_id
+        is_control = bytearray(len(idx_to_id))
+        for comp_id in self._control_set:
+            is_control[csr.id_to_idx[comp_id]] = 1
+        
+        # seen[saw_control][node] marks the states already queued
+        seen = (bytearray(len(idx_to_id)), bytearray(len(idx_to_id)))
+        queue = deque()
+        for source in csr.sources():
+            saw_control = is_control[source]
+            seen[saw_control][source] = 1
+            queue.append((source, saw_control))
+        
+        while queue:
+            node, saw_control = queue.popleft()
+            for child in indices[indptr[node]:indptr[node + 1]]:
+                child_saw = saw_control | is_control[child]
+                if not seen[child_saw][child]:
+                    seen[child_saw][child] = 1
+                    queue.append((child, child_saw))
         
-        return has_control
+        return set(compress(idx_to_id, seen[1]))
     
-    def _has_control_point_in_path(self, field_id: str) -> bool:
-        """Check if any path to a field contains a control point"""
-        # Get all paths to the field
-        sources = [comp_id for comp_id, comp in self.network.components.items() 
-                  if not comp.connections_from]
-                  
-        for source_id in sources:
-            paths = self.network.get_all_paths(source_id, field_id)
-            if any(self._is_valid_field_path(path) for path in paths):
-                return True
-                
-        return False
\ No newline at end of file
+    def _fed_through_control_point_on_paths(self) -> Set[str]:
+        """
+        IDs of fields that some source reaches by a simple path through a control point
+        
+        Enumerates paths per field, so it is only used when the network has a
+        cycle and the single sweep of _fed_through_control_point does not apply.
+        """
+        control_set = self._control_set
+        iter_paths = self.network.iter_paths
+        return {
+            field_id for field_id in self._fields
+            if any(not control_set.isdisjoint(path)
+                   for source_id in self._sources
+                   for path in iter_paths(source_id, field_id))
+        }
@@ -10,7 +10,8 @@ from PyQt6.QtWidgets import (
     QScrollArea,
     QFrame
 )
-from PyQt6.QtCore import Qt, pyqtSignal
+from PyQt6.QtCore import Qt, pyqtSignal, QSignalBlocker
+from collections import defaultdict
 from typing import Dict, List, Optional
 from dataclasses import dataclass
 from datetime import datetime
@@ -71,69 +72,72 @@ class StrahlerLevelVisualizer(QGroupBox):
         
     def populate_tree(self):
         """Populate the tree with components and paths"""
+        # Hold off item signals, sorting and repaints until every item is in
+        blocker = QSignalBlocker(self.tree)
+        sorting = self.tree.isSortingEnabled()
+        self.tree.setUpdatesEnabled(False)
+        self.tree.setSortingEnabled(False)
         self.tree.clear()
         
         try:
+            # Items are built detached and each level added in one batch
             # Components section
-            comp_root = QTreeWidgetItem(self.tree)
-            comp_root.setText(0, f"Components ({len(self.level_data.components)})")
-            comp_root.setExpanded(True)
+            comp_root = QTreeWidgetItem([f"Components ({len(self.level_data.components)})"])
             
             # Group components by type
             comp_groups = self._group_components()
+            type_items = []
             for type_name, comps in comp_groups.items():
-                type_item = QTreeWidgetItem(comp_root)
-                type_item.setText(0, type_name)
-                type_item.setText(1, str(len(comps)))
-                
-                for comp in sorted(comps):
-                    comp_item = QTreeWidgetItem(type_item)
-                    comp_item.setText(0, comp)
-                    comp_item.setText(1, self._get_component_type(comp))
+                type_item = QTreeWidgetItem([type_name, str(len(comps))])
+                type_item.addChildren([
+                    QTreeWidgetItem([comp, self._get_component_type(comp)])
+                    for comp in sorted(comps)
+                ])
+                type_items.append(type_item)
+            comp_root.addChildren(type_items)
+            roots = [comp_root]
             
             # Paths section
             if self.level_data.paths:
-                paths_root = QTreeWidgetItem(self.tree)
-                paths_root.setText(0, f"Paths ({len(self.level_data.paths)})")
-                paths_root.setExpanded(True)
+                paths_root = QTreeWidgetItem([f"Paths ({len(self.level_data.paths)})"])
                 
                 # Group paths by start component
                 path_groups = self._group_paths()
+                start_items = []
                 for start_comp, paths in path_groups.items():
-                    start_item = QTreeWidgetItem(paths_root)
-                    start_item.setText(0, f"From {start_comp}")
-                    start_item.setText(1, f"{len(paths)} paths")
-                    
-                    for path in paths:
-                        path_item = QTreeWidgetItem(start_item)
-                        path_item.setText(0, " → ".join(path))
-                        path_item.setText(2, f"{len(path)} nodes")
+                    start_item = QTreeWidgetItem([f"From {start_comp}", f"{len(paths)} paths"])
+                    start_item.addChildren([
+                        QTreeWidgetItem([" → ".join(path), "", f"{len(path)} nodes"])
+                        for path in paths
+                    ])
+                    start_items.append(start_item)
+                paths_root.addChildren(start_items)
+                roots.append(paths_root)
+            
+            self.tree.addTopLevelItems(roots)
+            for root in roots:
+                root.setExpanded(True)
                         
         except Exception as e:
-            error_item = QTreeWidgetItem(self.tree)
-            error_item.setText(0, "Error in visualization")
-            error_item.setText(1, str(e))
+            self.tree.addTopLevelItem(QTreeWidgetItem(["Error in visualization", str(e)]))
+        finally:
+            self.tree.setSortingEnabled(sorting)
+            self.tree.setUpdatesEnabled(True)
+            blocker.unblock()
     
     def _group_components(self) -> Dict[str, List[str]]:
         """Group components by their type"""
-        groups = {}
+        groups = defaultdict(list)
         for comp in self.level_data.components:
-            comp_type = self._get_component_type(comp)
-            if comp_type not in groups:
-                groups[comp_type] = []
-            groups[comp_type].append(comp)
+            groups[self._get_component_type(comp)].append(comp)
         return groups
     
     def _group_paths(self) -> Dict[str, List[List[str]]]:
         """Group paths by their starting component"""
-        groups = {}
+        groups = defaultdict(list)
         for path in self.level_data.paths:
-            if not path:
-                continue
-            start = path[0]
-            if start not in groups:
-                groups[start] = []
-            groups[start].append(path)
+            if path:
+                groups[path[0]].append(path)
         return groups
     
     def _get_component_type(self, comp_id: str) -> str:
@@ -12,11 +12,42 @@ from PyQt6.QtWidgets import (
     QSplitter,
     QScrollArea,
 )
-from PyQt6.QtCore import Qt
-from typing import Dict, List, Optional
+from PyQt6.QtCore import Qt, QObject, QRunnable, QThreadPool, pyqtSignal
+from collections import deque
+from functools import partial
+from typing import Callable, Dict, List, Optional
+import logging
 from parsers.mermaid_parser import MermaidParser
 from core.network import IrrigationNetwork
 
+logger = logging.getLogger(__name__)
+
+MAX_DISPLAYED_PATHS = 500  # Paths listed for a component before the list is truncated
+
+class PathSearchSignals(QObject):
+    """Signals for PathSearchWorker"""
+    finished = pyqtSignal(object, str, object)  # Searched network, component ID, found paths
+    failed = pyqtSignal(object, str, str)  # Searched network, component ID, error message
+
+class PathSearchWorker(QRunnable):
+    """Runs a component path search on the thread pool"""
+    
+    def __init__(self, network: IrrigationNetwork, component_id: str,
+                 search: Callable[[IrrigationNetwork, str], List[List[str]]]):
+        super().__init__()
+        self.network = network
+        self.component_id = component_id
+        self.search = search
+        self.signals = PathSearchSignals()
+    
+    def run(self):
+        try:
+            paths = self.search(self.network, self.component_id)
+        except Exception as e:
+            self.signals.failed.emit(self.network, self.component_id, str(e))
+            return
+        self.signals.finished.emit(self.network, self.component_id, paths)
+
 class NetworkStructureTab(QWidget):
     """Tab for displaying and analyzing irrigation network structure"""
     
@@ -24,6 +55,7 @@ class NetworkStructureTab(QWidget):
         super().__init__()
         self.network: Optional[IrrigationNetwork] = None
         self.parser = MermaidParser()
+        self._path_worker: Optional[PathSearchWorker] = None
         self.initUI()
         
     def initUI(self):
@@ -134,13 +166,11 @@ class NetworkStructureTab(QWidget):
         
         if file_name:
             try:
-                with open(file_name, 'r') as file:
-                    content = file.read()
+                # Parse network straight from the file, one line at a time
+                with open(file_name, 'r', buffering=1 << 20) as file:
+                    self.network = self.parser.parse_stream(file)
                 self.file_label.setText(f"Loaded: {file_name}")
                 
-                # Parse network
-                self.network = self.parser.parse(content)
-                
                 # Update UI
                 self.update_level_combo()
                 self.display_network_structure()
@@ -168,34 +198,68 @@ class NetworkStructureTab(QWidget):
                          in self.network.components.items() 
                          if comp.level == 0]
         
+        # Build the items detached and insert them in one batch
+        self.network_tree.setUpdatesEnabled(False)
+        root_items = []
+        built: Dict[str, QTreeWidgetItem] = {}  # Shared so reconverging branches are built once
         for root_id in root_components:
             root_comp = self.network.components[root_id]
             root_item = self.create_tree_item(None, root_id, root_comp)
-            self.add_child_components(root_item, root_id)
+            self.add_child_components(root_item, root_id, built)
+            root_items.append(root_item)
+        self.network_tree.addTopLevelItems(root_items)
+        self.network_tree.setUpdatesEnabled(True)
     
     def create_tree_item(self, parent: Optional[QTreeWidgetItem], 
                         comp_id: str, component: 'NetworkComponent') -> QTreeWidgetItem:
-        """Create a tree item for a component"""
-        if parent is None:
-            item = QTreeWidgetItem(self.network_tree)
-        else:
-            item = QTreeWidgetItem(parent)
-        
-        item.setText(0, comp_id)
-        item.setText(1, component.component_type)
-        item.setText(2, str(component.level))
+        """Create a tree item for a component, detached when no parent is given"""
+        # All columns are set before the item is attached to a tree
+        item = QTreeWidgetItem([comp_id, component.component_type, str(component.level)])
+        if parent is not None:
+            parent.addChild(item)
         return item
     
-    def add_child_components(self, parent_item: QTreeWidgetItem, parent_id: str):
-        """Add child components to tree"""
+    def add_child_components(self, parent_item: QTreeWidgetItem, parent_id: str,
+                             built: Optional[Dict[str, QTreeWidgetItem]] = None):
+        """
+        Add child components to tree
+        
+        Subtrees already present in built are cloned instead of rebuilt, and
+        completed subtrees are added to it. Children that would close a cycle
+        are left out, and subtrees cut short that way are not added to built,
+        since the same component reached from another parent keeps them.
+        """
         if parent_id not in self.network.components:
             return
-        
-        parent = self.network.components[parent_id]
-        for child_id in sorted(parent.connections_to):
-            child = self.network.components[child_id]
-            child_item = self.create_tree_item(parent_item, child_id, child)
-            self.add_child_components(child_item, child_id)
+        if built is None:
+            built = {}
+        
+        components = self.network.components
+        # [item, component ID, child iterator, whether a cycle was cut below it]
+        stack = [[parent_item, parent_id, iter(components[parent_id].connections_to_sorted), False]]
+        on_stack = {parent_id}
+        while stack:
+            frame = stack[-1]
+            item, comp_id, children = frame[0], frame[1], frame[2]
+            for child_id in children:
+                if child_id in built:
+                    item.addChild(built[child_id].clone())
+                elif child_id in on_stack:
+                    frame[3] = True
+                else:
+                    child = components[child_id]
+                    child_item = self.create_tree_item(item, child_id, child)
+                    stack.append([child_item, child_id, iter(child.connections_to_sorted), False])
+                    on_stack.add(child_id)
+                    break
+            else:
+                stack.pop()
+                on_stack.discard(comp_id)
+                if frame[3]:
+                    if stack:
+                        stack[-1][3] = True
+                else:
+                    built[comp_id] = item
     
     def on_level_selected(self, index: int):
         """Handle hierarchy level selection"""
@@ -213,14 +277,21 @@ class NetworkStructureTab(QWidget):
         components = self.network.get_components_by_level().get(level, [])
         
         # Add components to tree
+        self.network_tree.setUpdatesEnabled(False)
+        items = []
+        network_components = self.network.components
+        create_tree_item = self.create_tree_item
         for comp_id in sorted(components):
-            comp = self.network.components[comp_id]
-            item = self.create_tree_item(None, comp_id, comp)
+            comp = network_components[comp_id]
+            item = create_tree_item(None, comp_id, comp)
             # Add immediate children
-            for child_id in sorted(comp.connections_to):
-                if child_id in self.network.components:
-                    child = self.network.components[child_id]
-                    self.create_tree_item(item, child_id, child)
+            for child_id in comp.connections_to_sorted:
+                child = network_components.get(child_id)
+                if child is not None:
+                    create_tree_item(item, child_id, child)
+            items.append(item)
+        self.network_tree.addTopLevelItems(items)
+        self.network_tree.setUpdatesEnabled(True)
     
     def on_component_selected(self, item: QTreeWidgetItem):
         """Handle component selection in tree"""
@@ -242,57 +313,113 @@ class NetworkStructureTab(QWidget):
             'Type': component.component_type,
             'Level': component.level,
             'Label': component.label,
-            'Connections To': ', '.join(sorted(component.connections_to)) or 'None',
-            'Connections From': ', '.join(sorted(component.connections_from)) or 'None'
+            'Connections To': ', '.join(component.connections_to_sorted) or 'None',
+            'Connections From': ', '.join(component.connections_from_sorted) or 'None'
         }
         
-        for key, value in details.items():
-            item = QTreeWidgetItem(self.details_tree)
-            item.setText(0, key)
-            item.setText(1, str(value))
+        self.details_tree.setUpdatesEnabled(False)
+        self.details_tree.addTopLevelItems([
+            QTreeWidgetItem([key, str(value)]) for key, value in details.items()
+        ])
+        self.details_tree.setUpdatesEnabled(True)
     
     def display_component_paths(self, component_id: str):
         """Display paths connected to the component"""
         self.paths_tree.clear()
+        QTreeWidgetItem(self.paths_tree, ["Computing paths..."])
         
         # Get all paths that include this component
         if component_id.startswith('F'):  # If it's a field
-            paths = self.network.get_field_feeding_path(component_id)
+            search = lambda network, field_id: network.get_field_feeding_path(field_id)
         else:  # For other components, find all paths that contain it
-            paths = self.find_paths_containing_component(component_id)
+            search = partial(self.find_paths_containing_component, max_paths=MAX_DISPLAYED_PATHS)
+            self.network.build_csr()  # Warm the cache here so the worker only reads it
+        
+        # Enumerate on the thread pool so large networks don't freeze the UI
+        self._path_worker = PathSearchWorker(self.network, component_id, search)
+        self._path_worker.signals.finished.connect(self.on_paths_found)
+        self._path_worker.signals.failed.connect(self.on_path_search_failed)
+        QThreadPool.globalInstance().start(self._path_worker)
+    
+    def _is_current_search(self, network: IrrigationNetwork, component_id: str) -> bool:
+        """Check that a search result belongs to the loaded network and selected component"""
+        return (network is self.network and self._path_worker is not None
+                and component_id == self._path_worker.component_id)
+    
+    def on_paths_found(self, network: IrrigationNetwork, component_id: str,
+                       paths: List[List[str]]):
+        """Display paths found by the path search worker"""
+        # Ignore results for a replaced network or a component that is no longer selected
+        if not self._is_current_search(network, component_id):
+            return
         
-        # Display paths
-        for i, path in enumerate(paths, 1):
-            item = QTreeWidgetItem(self.paths_tree)
-            item.setText(0, f"Path {i}")
-            item.setText(1, " → ".join(path))
+        self.paths_tree.clear()
+        self.paths_tree.setUpdatesEnabled(False)
+        self.paths_tree.addTopLevelItems([
+            QTreeWidgetItem([f"Path {i}", " → ".join(path)])
+            for i, path in enumerate(paths[:MAX_DISPLAYED_PATHS], 1)
+        ])
+        if len(paths) > MAX_DISPLAYED_PATHS:
+            self.paths_tree.addTopLevelItem(QTreeWidgetItem(["(truncated)"]))
+        self.paths_tree.setUpdatesEnabled(True)
+    
+    def on_path_search_failed(self, network: IrrigationNetwork, component_id: str, message: str):
+        """Report a path search error for the selected component"""
+        if not self._is_current_search(network, component_id):
+            return
+        logger.error("Error finding paths for %s: %s", component_id, message)
+        self.paths_tree.clear()
+        QTreeWidgetItem(self.paths_tree, [f"Error finding paths: {message}"])
     
-    def find_paths_containing_component(self, component_id: str) -> List[List[str]]:
-        """Find all paths that contain the given component"""
+    @staticmethod
+    def find_paths_containing_component(network: IrrigationNetwork, component_id: str,
+                                        max_paths: Optional[int] = None) -> List[List[str]]:
+        """Find all paths that contain the given component, stopping after max_paths + 1"""
         paths = []
-        visited = set()
-        
-        def dfs(current: str, path: List[str]):
-            if current in visited:
-                return
-            visited.add(current)
-            path.append(current)
-            
-            if not self.network.components[current].connections_to:
-                if component_id in path:
-                    paths.append(path.copy())
-            else:
-                for next_id in self.network.components[current].connections_to:
-                    dfs(next_id, path.copy())
-            
-            visited.remove(current)
-        
-        # Start from root components
-        root_components = [comp_id for comp_id, comp 
-                         in self.network.components.items() 
-                         if not comp.connections_from]
-        
-        for root_id in root_components:
-            dfs(root_id, [])
+        csr = network.build_csr()
+        indptr_out, indices_out = csr.indptr_out, csr.indices_out
+        idx_to_id = csr.idx_to_id
+        target = csr.id_to_idx[component_id]
+        
+        # Only ancestors and descendants of the component can lie on a path through it
+        in_subgraph = bytearray(len(idx_to_id))
+        in_subgraph[target] = 1
+        for indptr, indices in ((csr.indptr_in, csr.indices_in), (indptr_out, indices_out)):
+            reached = bytearray(len(idx_to_id))
+            queue = deque([target])
+            while queue:
+                node = queue.popleft()
+                for next_node in indices[indptr[node]:indptr[node + 1]]:
+                    if not reached[next_node]:
+                        reached[next_node] = in_subgraph[next_node] = 1
+                        queue.append(next_node)
+        
+        # Walk the subgraph from root components with one shared path list
+        on_path = bytearray(len(idx_to_id))
+        path: List[int] = []
+        stack = []
+        
+        def push(node: int):
+            on_path[node] = 1
+            path.append(node)
+            first, last = indptr_out[node], indptr_out[node + 1]
+            stack.append(iter(indices_out[first:last]))
+            if first == last and on_path[target]:  # Sink reached through the component
+                paths.append([idx_to_id[i] for i in path])
+        
+        for root in csr.sources():
+            if not in_subgraph[root]:
+                continue
+            push(root)
+            while stack:
+                for next_node in stack[-1]:
+                    if in_subgraph[next_node] and not on_path[next_node]:
+                        push(next_node)
+                        if max_paths is not None and len(paths) > max_paths:
+                            return paths
+                        break
+                else:
+                    stack.pop()
+                    on_path[path.pop()] = 0
         
         return paths
\ No newline at end of file
@@ -5,8 +5,7 @@ from PyQt6.QtWidgets import (
     QPushButton,
     QLabel,
     QFileDialog,
-    QTreeWidget,
-    QTreeWidgetItem,
+    QTreeView,
     QComboBox,
     QFrame,
     QSplitter,
@@ -14,21 +13,18 @@ from PyQt6.QtWidgets import (
     QGroupBox,
     QProgressBar
 )
-from PyQt6.QtCore import Qt, pyqtSignal
-from typing import Dict, List, Optional
+from PyQt6.QtCore import Qt, pyqtSignal, QObject, QRunnable, QThreadPool
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+import hashlib
+import io
+import logging
 from parsers.mermaid_parser import MermaidParser
 from core.network import IrrigationNetwork
-from core.strahler import StrahlerAnalyzer
+from core.network_analyzer import AnalysisStep
+from gui.tree_models import GroupedTreeModel, TreeGroup
 
-class AnalysisStep:
-    """Represents a single analysis step"""
-    def __init__(self, number: int, description: str, components: List, 
-                 requires_approval: bool = False):
-        self.step_number = number
-        self.description = description
-        self.components = components
-        self.requires_approval = requires_approval
-        self.approved = False
+logger = logging.getLogger(__name__)
 
 class AnalysisStepWidget(QGroupBox):
     """Widget for displaying and interacting with a single analysis step"""
@@ -37,7 +33,13 @@ class AnalysisStepWidget(QGroupBox):
     def __init__(self, step: AnalysisStep, parent=None):
         super().__init__(parent)
         self.step = step
-        print(f"\nInitializing Step {step.step_number} widget")  # Debug print
+        self._dirty = False  # Tree still to be populated on first show
+        # The step number is fixed, so pick its group builder and expansion once
+        self._build_groups, self._expand_groups = {
+            1: (self._component_type_groups, True),
+            4: (self._strahler_result_groups, True),  # Strahler analysis
+        }.get(step.step_number, (self._regular_component_groups, False))
+        logger.debug("Initializing Step %s widget", step.step_number)
         self.initUI()
         
     def initUI(self):
@@ -48,16 +50,15 @@ class AnalysisStepWidget(QGroupBox):
         if self.step.step_number in [2, 3]:
             result_label = QLabel()
             if self.step.step_number == 2:
-                result_label.setText(f"Found {len(self.step.components)} connections")
+                result_label.setText(self.step.components[0])
             else:  # Step 3
                 result_label.setText("Strahler numbers calculated")
             layout.addWidget(result_label)
         else:
-            # Create tree widget for components
-            self.tree = QTreeWidget()
-            self.tree.setHeaderLabels(["Component", "Type", "Details"])
+            # Create tree view for components, filled in on first show
+            self.tree = QTreeView()
             self.tree.setMinimumHeight(150)
-            self.populate_tree()
+            self._dirty = True
             layout.addWidget(self.tree)
         
         # Add approval button if required
@@ -74,79 +75,73 @@ class AnalysisStepWidget(QGroupBox):
             if self.step.approved:
                 self.approve_btn.setText("Approved ✓")
     
+    def showEvent(self, event):
+        """Populate the tree the first time the widget is shown"""
+        super().showEvent(event)
+        if self._dirty:
+            self._dirty = False
+            self.populate_tree()
+    
     def populate_tree(self):
         """Populate tree with step components"""
-        self.tree.clear()
-        
         try:
-            if self.step.step_number == 1:
-                # Group components by type
-                components_by_type = {}
-                for comp in self.step.components:
-                    comp_type = comp.get('type', 'unknown')
-                    if comp_type not in components_by_type:
-                        components_by_type[comp_type] = []
-                    components_by_type[comp_type].append(comp)
-                
-                # Add components grouped by type
-                for comp_type, components in sorted(components_by_type.items()):
-                    type_item = QTreeWidgetItem(self.tree)
-                    type_item.setText(0, f"{comp_type.replace('_', ' ').title()} ({len(components)})")
-                    type_item.setExpanded(True)
-                    
-                    for comp in sorted(components, key=lambda x: x['id']):
-                        comp_item = QTreeWidgetItem(type_item)
-                        comp_item.setText(0, comp['id'])
-                        comp_item.setText(1, comp['type'])
-                        comp_item.setText(2, comp.get('label', ''))
-            
-            elif self.step.step_number == 4:  # Strahler analysis
-                self._populate_strahler_results()
-                
-            else:
-                self._populate_regular_components()
-                
+            groups = self._build_groups()
+            expand = self._expand_groups
         except Exception as e:
-            error_item = QTreeWidgetItem(self.tree)
-            error_item.setText(0, "Error displaying components")
-            error_item.setText(1, str(e))
-            print(f"Error in populate_tree: {str(e)}")  # Debug print
+            groups = [TreeGroup(["Error displaying components", str(e)], [])]
+            expand = False
+            logger.error("Error in populate_tree: %s", e)
+        
+        # The model reads the step data directly, no per-row items are created
+        self.model = GroupedTreeModel(["Component", "Type", "Details"], groups, self.tree)
+        # Lay the tree out once after all groups are expanded
+        self.tree.setUpdatesEnabled(False)
+        try:
+            self.tree.setModel(self.model)
+            if expand:
+                for row in range(len(groups)):
+                    self.tree.expand(self.model.index(row, 0))
+        finally:
+            self.tree.setUpdatesEnabled(True)
+    
+    def _component_type_groups(self) -> List[TreeGroup]:
+        """Group identified components by type"""
+        components_by_type = defaultdict(list)
+        for comp in self.step.components:
+            components_by_type[comp.get('type', 'unknown')].append(comp)
+        
+        return [
+            TreeGroup([f"{comp_type.replace('_', ' ').title()} ({len(components)})"],
+                      sorted(components, key=lambda x: x['id']),
+                      lambda comp: [comp['id'], comp['type'], comp.get('label', '')])
+            for comp_type, components in sorted(components_by_type.items())
+        ]
     
-    def _populate_strahler_results(self):
-        """Populate Strahler analysis results"""
+    def _strahler_result_groups(self) -> List[TreeGroup]:
+        """Group Strahler analysis results by level"""
         # Group by Strahler number
-        by_level = {}
+        by_level = defaultdict(list)
         for comp_id, level in self.step.components.items():
-            if level not in by_level:
-                by_level[level] = []
             by_level[level].append(comp_id)
         
-        # Add to tree
-        for level in sorted(by_level.keys()):
-            level_item = QTreeWidgetItem(self.tree)
-            level_item.setText(0, f"Level {level}")
-            level_item.setText(1, f"{len(by_level[level])} components")
-            level_item.setExpanded(True)
-            
-            for comp_id in sorted(by_level[level]):
-                comp_item = QTreeWidgetItem(level_item)
-                comp_item.setText(0, comp_id)
-                comp_item.setText(1, "Component")
-                comp_item.setText(2, f"Strahler: {level}")
+        groups = []
+        for level in sorted(by_level):
+            comp_ids = by_level[level]
+            comp_ids.sort()
+            groups.append(TreeGroup([f"Level {level}", f"{len(comp_ids)} components"], comp_ids,
+                                    lambda comp_id, level=level: [comp_id, "Component", f"Strahler: {level}"]))
+        return groups
     
-    def _populate_regular_components(self):
+    def _regular_component_groups(self) -> List[TreeGroup]:
         """Handle regular components"""
+        groups = []
         for component in self.step.components:
-            item = QTreeWidgetItem(self.tree)
-            if isinstance(component, str):
-                item.setText(0, str(component))
-            elif isinstance(component, dict):
-                for key, value in component.items():
-                    child = QTreeWidgetItem(item)
-                    child.setText(0, str(key))
-                    child.setText(1, str(value))
+            if isinstance(component, dict):
+                groups.append(TreeGroup([""], list(component.items()),
+                                        lambda pair: [str(pair[0]), str(pair[1])]))
             else:
-                item.setText(0, str(component))
+                groups.append(TreeGroup([str(component)], []))
+        return groups
     
     def on_approve(self):
         """Handle step approval"""
@@ -155,17 +150,64 @@ class AnalysisStepWidget(QGroupBox):
         self.approve_btn.setEnabled(False)
         self.approved.emit(self.step.step_number)
 
+ParseResult = Tuple[IrrigationNetwork, Dict[str, int]]
+
+class ParseSignals(QObject):
+    """Signals for ParseWorker"""
+    finished = pyqtSignal(object, object, str)  # Parsed network, Strahler numbers, file digest
+    failed = pyqtSignal(str)
+
+class ParseWorker(QRunnable):
+    """Reads, parses and runs the Strahler analysis for a network file on the thread pool"""
+    
+    def __init__(self, file_name: str, cache: Dict[str, ParseResult]):
+        super().__init__()
+        self.file_name = file_name
+        self.cache = cache  # Earlier results by file digest, only read here
+        self.signals = ParseSignals()
+    
+    def run(self):
+        try:
+            with open(self.file_name, 'rb') as file:
+                digest = self._digest(file)
+                cached = self.cache.get(digest)
+                if cached is not None:
+                    network, strahler_numbers = cached
+                else:
+                    file.seek(0)
+                    network = MermaidParser().parse_stream(io.TextIOWrapper(file))
+                    # Cached on the network with its CSR arrays for later tabs to reuse
+                    strahler_numbers = network.get_strahler_order()
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+            return
+        self.signals.finished.emit(network, strahler_numbers, digest)
+    
+    @staticmethod
+    def _digest(file) -> str:
+        """Hash the file's bytes in 1 MiB chunks"""
+        hasher = hashlib.blake2b(digest_size=16)
+        for chunk in iter(lambda: file.read(1 << 20), b''):
+            hasher.update(chunk)
+        return hasher.hexdigest()
+
 class NetworkAnalysisTab(QWidget):  # Changed class name from NetworkTab to NetworkAnalysisTab
     """Main network analysis tab"""
     network_processed = pyqtSignal(IrrigationNetwork)
     proceed_to_strahler = pyqtSignal()  # Signal for tab switching
     
+    PARSE_CACHE_SIZE = 4  # Parsed files kept for re-uploads
+    
     def __init__(self):
         super().__init__()
         self.network = None
-        self.strahler_analyzer = StrahlerAnalyzer()
         self.analysis_steps: List[AnalysisStep] = []
         self.step_widgets: Dict[int, AnalysisStepWidget] = {}
+        self._pending_update = False  # Step widgets still to be built on next show
+        self._completed = 0  # Steps approved or not needing approval
+        self._parse_worker: Optional[ParseWorker] = None
+        self._strahler_numbers: Optional[Dict[str, int]] = None  # Computed by the parse worker
+        self._parse_cache: Dict[str, ParseResult] = {}  # Oldest first
         self.initUI()
         
     def initUI(self):
@@ -198,16 +240,12 @@ class NetworkAnalysisTab(QWidget):  # Changed class name from NetworkTab to Netw
         main_layout.addWidget(progress_frame)
         
         # Analysis Steps Section
-        steps_scroll = QScrollArea()
-        steps_scroll.setWidgetResizable(True)
-        steps_scroll.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self.steps_scroll = QScrollArea()
+        self.steps_scroll.setWidgetResizable(True)
+        self.steps_scroll.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self._reset_steps_container()
         
-        self.steps_container = QWidget()
-        self.steps_layout = QVBoxLayout(self.steps_container)
-        self.steps_layout.addStretch()
-        steps_scroll.setWidget(self.steps_container)
-        
-        main_layout.addWidget(steps_scroll)
+        main_layout.addWidget(self.steps_scroll)
         
         # Initial state
         self.progress_bar.setValue(0)
@@ -222,38 +260,71 @@ class NetworkAnalysisTab(QWidget):  # Changed class name from NetworkTab to Netw
         )
         
         if file_name:
-            try:
-                self.clear_analysis()
-                
-                with open(file_name, 'r') as file:
-                    content = file.read()
-                self.file_label.setText(f"Loaded: {file_name}")
-                
-                # Parse network
-                parser = MermaidParser()
-                self.network = parser.parse(content)
-                
-                # Start analysis
-                self.start_analysis()
-                
-            except Exception as e:
-                self.file_label.setText(f"Error loading file: {str(e)}")
-                print(f"Error details: {str(e)}")
+            self.clear_analysis()
+            self.file_label.setText(f"Loading: {file_name}")
+            
+            # Parse and analyze on the thread pool so the UI stays responsive
+            self.upload_btn.setEnabled(False)
+            self.progress_bar.setRange(0, 0)  # Busy indicator
+            self._parse_worker = ParseWorker(file_name, self._parse_cache)
+            self._parse_worker.signals.finished.connect(self._on_parsed)
+            self._parse_worker.signals.failed.connect(self._on_parse_failed)
+            QThreadPool.globalInstance().start(self._parse_worker)
+    
+    def _end_parse(self):
+        """Restore the upload controls after the parse worker finishes"""
+        self.upload_btn.setEnabled(True)
+        self.progress_bar.setRange(0, 3)
+    
+    def _on_parsed(self, network: IrrigationNetwork, strahler_numbers: Dict[str, int],
+                   digest: str):
+        """Start the analysis of a network parsed by the worker"""
+        self._end_parse()
+        
+        # Remember the result so the same file is not parsed again
+        self._parse_cache.pop(digest, None)
+        self._parse_cache[digest] = (network, strahler_numbers)
+        if len(self._parse_cache) > self.PARSE_CACHE_SIZE:
+            del self._parse_cache[next(iter(self._parse_cache))]
+        
+        try:
+            self.file_label.setText(f"Loaded: {self._parse_worker.file_name}")
+            self.network = network
+            self._strahler_numbers = strahler_numbers
+            
+            # Start analysis
+            self.start_analysis()
+            
+        except Exception as e:
+            self._on_parse_failed(str(e))
+    
+    def _on_parse_failed(self, message: str):
+        """Report a file that could not be loaded"""
+        self._end_parse()
+        self.file_label.setText(f"Error loading file: {message}")
+        logger.error("Error details: %s", message)
     
     def clear_analysis(self):
         """Clear previous analysis results"""
         self.network = None
+        self._strahler_numbers = None
         self.analysis_steps = []
         self.step_widgets.clear()
+        self._pending_update = False
+        self._completed = 0
         
-        while self.steps_layout.count():
-            child = self.steps_layout.takeAt(0)
-            if child.widget():
-                child.widget().deleteLater()
-        
-        self.steps_layout.addStretch()
+        self._reset_steps_container()
         self.progress_bar.setValue(0)
     
+    def _reset_steps_container(self):
+        """Give the scroll area an empty steps container"""
+        # The scroll area deletes the previous container, and with it every
+        # step widget, in one go rather than one layout removal per widget
+        self.steps_container = QWidget()
+        self.steps_layout = QVBoxLayout(self.steps_container)
+        self.steps_layout.addStretch()
+        self.steps_scroll.setWidget(self.steps_container)
+    
     def create_analysis_steps(self):
         """Create analysis steps for the network"""
         steps = []
@@ -268,15 +339,16 @@ class NetworkAnalysisTab(QWidget):  # Changed class name from NetworkTab to Netw
             })
         steps.append(AnalysisStep(1, "Component Identification", components, True))
         
-        # Step 2: Connection Analysis
-        connections = []
-        for comp_id, comp in self.network.components.items():
-            for target_id in comp.connections_to:
-                connections.append((comp_id, target_id))
-        steps.append(AnalysisStep(2, "Connection Analysis", connections, True))
+        # Step 2: Connection Analysis, only the count is shown so the edge
+        # list is not built; it is the CSR's edge total
+        connection_count = self.network.build_csr().indptr_out[-1]
+        steps.append(AnalysisStep(2, "Connection Analysis",
+                                  [f"Found {connection_count} connections"], True))
         
-        # Step 3: Strahler Analysis
-        strahler_numbers = self.strahler_analyzer.analyze_network(self.network.components)
+        # Step 3: Strahler Analysis, usually already computed by the parse worker
+        strahler_numbers = self._strahler_numbers
+        if strahler_numbers is None:
+            strahler_numbers = self.network.get_strahler_order()
         steps.append(AnalysisStep(3, "Strahler Analysis", strahler_numbers, True))
         
         return steps
@@ -288,7 +360,27 @@ class NetworkAnalysisTab(QWidget):  # Changed class name from NetworkTab to Netw
         
         # Create analysis steps
         self.analysis_steps = self.create_analysis_steps()
+        self._completed = sum(1 for step in self.analysis_steps
+                              if not step.requires_approval or step.approved)
+        self.progress_bar.setMaximum(len(self.analysis_steps))
+        
+        # Build the step widgets only once the tab is on screen
+        if not self.isVisible():
+            self._pending_update = True
+            self.update_progress()
+            return
         
+        self._create_step_widgets()
+    
+    def showEvent(self, event):
+        """Build step widgets deferred while the tab was hidden"""
+        super().showEvent(event)
+        if self._pending_update:
+            self._pending_update = False
+            self._create_step_widgets()
+    
+    def _create_step_widgets(self):
+        """Add a widget for each analysis step"""
         # Remove stretch
         if self.steps_layout.count() > 0:
             self.steps_layout.takeAt(self.steps_layout.count() - 1)
@@ -309,8 +401,8 @@ class NetworkAnalysisTab(QWidget):  # Changed class name from NetworkTab to Netw
     
     def on_step_approved(self, step_number: int):
         """Handle step approval"""
-        print(f"Step {step_number} approved")
-        self.progress_bar.setValue(step_number)
+        logger.debug("Step %s approved", step_number)
+        self._completed += 1
         self.update_progress()
         
         # Emit signal when network is fully processed
@@ -320,6 +412,4 @@ class NetworkAnalysisTab(QWidget):  # Changed class name from NetworkTab to Netw
     
     def update_progress(self):
         """Update progress bar based on completed steps"""
-        completed = len([step for step in self.analysis_steps 
-                        if not step.requires_approval or step.approved])
-        self.progress_bar.setValue(completed)
\ No newline at end of file
+        self.progress_bar.setValue(self._completed)
\ No newline at end of file
@@ -11,13 +11,45 @@ from PyQt6.QtWidgets import (
     QScrollArea,
     QGroupBox
 )
-from PyQt6.QtCore import Qt
-from typing import Dict, List, Optional
+from PyQt6.QtCore import Qt, pyqtSignal, QObject, QRunnable, QThreadPool
+from typing import Dict, List, Optional, Tuple
+import logging
 from parsers.mermaid_parser import MermaidParser
 from core.network import IrrigationNetwork
 from gui.strahler_visualization import StrahlerVisualization, StrahlerLevel
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
+
+class LevelPathSignals(QObject):
+    """Signals for LevelPathWorker"""
+    finished = pyqtSignal(object, object)  # Analysed network, StrahlerLevel list
+    failed = pyqtSignal(object, str)  # Analysed network, error message
+
+class LevelPathWorker(QRunnable):
+    """Finds the paths within every Strahler level on the thread pool"""
+    
+    def __init__(self, network: IrrigationNetwork, strahler_numbers: Dict[str, int],
+                 levels: List[Tuple[int, List[str]]]):
+        super().__init__()
+        self.network = network
+        self.strahler_numbers = strahler_numbers
+        self.levels = levels
+        self.signals = LevelPathSignals()
+    
+    def run(self):
+        try:
+            strahler_levels = [
+                StrahlerLevel(level=level, components=components,
+                              paths=StrahlerAnalysisTab._find_level_paths(
+                                  self.network, self.strahler_numbers, level, components))
+                for level, components in self.levels
+            ]
+        except Exception as e:
+            self.signals.failed.emit(self.network, str(e))
+            return
+        self.signals.finished.emit(self.network, strahler_levels)
+
 class StrahlerAnalysisTab(QWidget):
     """Tab for Strahler-based network analysis"""
     
@@ -28,6 +60,7 @@ class StrahlerAnalysisTab(QWidget):
         self.visualization = None
         self.current_level = None
         self.strahler_levels: List[StrahlerLevel] = []
+        self._level_worker: Optional[LevelPathWorker] = None
         self.initUI()
         
     @property
@@ -143,23 +176,22 @@ class StrahlerAnalysisTab(QWidget):
             try:
                 self.clear_analysis()
                 
-                with open(file_name, 'r') as file:
-                    content = file.read()
-                self.file_label.setText(f"Loaded: {file_name}")
-                
+                # Parse network straight from the file, one line at a time
                 parser = MermaidParser()
-                self.network = parser.parse(content)
+                with open(file_name, 'r', buffering=1 << 20) as file:
+                    self.network = parser.parse(file)
+                self.file_label.setText(f"Loaded: {file_name}")
                 
                 self.start_analysis()
                 
             except Exception as e:
                 self.file_label.setText(f"Error loading file: {str(e)}")
-                print(f"Error details: {str(e)}")
+                logger.error("Error details: %s", e)
 
     def clear_analysis(self):
         """Clear the current analysis"""
         self.network = None
-        self.strahler_numbers.clear()
+        self.strahler_numbers = {}
         self.current_level = None
         self.strahler_levels.clear()
         if self.visualization:
@@ -177,18 +209,29 @@ class StrahlerAnalysisTab(QWidget):
             # Calculate Strahler numbers
             self.strahler_numbers = self.network.get_strahler_order()
             
-            # Group components by level
-            level_groups = self._group_by_level()
+            # Group components by level, cached on the network with its Strahler numbers
+            level_groups = self.network.get_components_by_level()
+            levels = sorted(level_groups.items(), reverse=True)
+            
+            # Path search can take a while on large levels, so it runs on the
+            # thread pool and the levels are shown once it finishes
+            self.details_text.setText("Finding level paths...")
+            self._level_worker = LevelPathWorker(self.network, self.strahler_numbers, levels)
+            self._level_worker.signals.finished.connect(self._on_level_paths)
+            self._level_worker.signals.failed.connect(self._on_analysis_failed)
+            QThreadPool.globalInstance().start(self._level_worker)
             
-            # Create StrahlerLevel objects
-            self.strahler_levels = []
-            for level, components in sorted(level_groups.items(), reverse=True):
-                paths = self._find_level_paths(level, components)
-                self.strahler_levels.append(StrahlerLevel(
-                    level=level,
-                    components=components,
-                    paths=paths
-                ))
+        except Exception as e:
+            self._on_analysis_failed(self.network, str(e))
+    
+    def _on_level_paths(self, network: IrrigationNetwork, strahler_levels: List[StrahlerLevel]):
+        """Show the levels once the worker has found their paths"""
+        # Ignore results for a network that has since been replaced
+        if network is not self.network:
+            return
+        
+        try:
+            self.strahler_levels = strahler_levels
             
             # Set progress bar maximum to number of levels
             self.progress_bar.setMaximum(len(self.strahler_levels))
@@ -204,73 +247,72 @@ class StrahlerAnalysisTab(QWidget):
             self._update_analysis_details()
             
         except Exception as e:
-            print(f"Error in analysis: {str(e)}")
-            self.details_text.setText(f"Error during analysis: {str(e)}")
+            self._on_analysis_failed(network, str(e))
     
-    def _group_by_level(self) -> Dict[int, List[str]]:
-        """Group components by their Strahler number"""
-        groups = {}
-        for comp_id, level in self.strahler_numbers.items():
-            if level not in groups:
-                groups[level] = []
-            groups[level].append(comp_id)
-        return groups
+    def _on_analysis_failed(self, network: IrrigationNetwork, message: str):
+        """Report an analysis error for the current network"""
+        if network is not self.network:
+            return
+        logger.error("Error in analysis: %s", message)
+        self.details_text.setText(f"Error during analysis: {message}")
     
-    def _find_level_paths(self, level: int, components: List[str]) -> List[List[str]]:
+    @staticmethod
+    def _find_level_paths(network: IrrigationNetwork, strahler_numbers: Dict[str, int],
+                          level: int, components: List[str]) -> List[List[str]]:
         """Find all paths between components at a given level"""
         paths = []
-        visited = set()
-        
-        def find_paths(start: str, current_path: List[str]):
-            if start in visited:
-                return
-                
-            visited.add(start)
-            current_path.append(start)
-            
-            if start in components and len(current_path) > 1:
-                paths.append(current_path.copy())
-            
-            component = self.network.components[start]
-            for next_id in component.connections_to:
-                if self.strahler_numbers.get(next_id) == level:
-                    find_paths(next_id, current_path.copy())
-            
-            visited.remove(start)
+        members = set(components)
+        network_components = network.components
         
+        # Depth-first walk from each component with an explicit stack of
+        # child iterators instead of recursion
         for comp_id in components:
-            find_paths(comp_id, [])
+            path = [comp_id]
+            on_path = {comp_id}
+            stack = [iter(network_components[comp_id].connections_to)]
+            while stack:
+                for next_id in stack[-1]:
+                    if next_id in on_path or strahler_numbers.get(next_id) != level:
+                        continue
+                    path.append(next_id)
+                    on_path.add(next_id)
+                    if next_id in members:
+                        paths.append(path.copy())
+                    stack.append(iter(network_components[next_id].connections_to))
+                    break
+                else:
+                    stack.pop()
+                    on_path.discard(path.pop())
         
         return paths
     
     def _update_analysis_details(self):
         """Update the analysis details display"""
-        if not self.network or not self.strahler_numbers:
+        if not self.network or not self.strahler_numbers or not self.strahler_levels:
             return
             
         details = []
         
+        # Per-level counts come from the StrahlerLevel groups built in
+        # start_analysis instead of rescanning every component's number
+        levels = sorted(self.strahler_levels, key=lambda l: l.level)
+        
         # Basic statistics
         total_components = len(self.strahler_numbers)
-        max_level = max(self.strahler_numbers.values())
-        approved_levels = sum(1 for level in self.strahler_levels if level.is_approved)
+        max_level = levels[-1].level
+        approved_levels = sum(1 for level in levels if level.is_approved)
         
         details.append(f"Total Components: {total_components}")
         details.append(f"Maximum Strahler Level: {max_level}")
-        details.append(f"Approved Levels: {approved_levels}/{len(self.strahler_levels)}")
+        details.append(f"Approved Levels: {approved_levels}/{len(levels)}")
         
         # Level statistics
-        level_counts = {}
-        for level in self.strahler_numbers.values():
-            level_counts[level] = level_counts.get(level, 0) + 1
-        
         details.append("\nComponents per Level:")
-        for level in sorted(level_counts.keys()):
-            details.append(f"Level {level}: {level_counts[level]} components")
+        for level_obj in levels:
+            details.append(f"Level {level_obj.level}: {len(level_obj.components)} components")
             
             # Add approval status if applicable
-            level_obj = next((l for l in self.strahler_levels if l.level == level), None)
-            if level_obj and level_obj.is_approved:
+            if level_obj.is_approved:
                 approval_time = level_obj.approval_time.strftime("%H:%M:%S")
                 details.append(f"  ✓ Approved at {approval_time}")
         
@@ -314,12 +356,12 @@ class StrahlerAnalysisTab(QWidget):
         
         if component.connections_from:
             details.append("\nConnected From:")
-            for conn in sorted(component.connections_from):
+            for conn in component.connections_from_sorted:
                 details.append(f"- {conn}")
                 
         if component.connections_to:
             details.append("\nConnected To:")
-            for conn in sorted(component.connections_to):
+            for conn in component.connections_to_sorted:
                 details.append(f"- {conn}")
         
         self.comp_details_text.setText("\n".join(details))
\ No newline at end of file
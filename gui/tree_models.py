@@ -0,0 +1,95 @@
+from PyQt6.QtCore import Qt, QAbstractItemModel, QModelIndex
+from typing import Any, Callable, List, Optional, Sequence
+
+class TreeGroup:
+    """A top-level row and the source list its child rows are read from"""
+    def __init__(self, columns: List[str], children: Sequence,
+                 child_columns: Optional[Callable[[Any], List[str]]] = None):
+        self.columns = columns
+        self.children = children
+        self.child_columns = child_columns or (lambda child: [str(child)])
+        self.row = 0
+        self.fetched = 0  # Child rows handed to the view so far
+
+class GroupedTreeModel(QAbstractItemModel):
+    """
+    Read-only two-level tree model over grouped data.
+
+    Child rows are formatted from the groups' source lists when the view asks
+    for them, so no per-row item objects are kept alongside the data. Groups
+    report their children in batches through canFetchMore/fetchMore, so rows
+    are only inserted as they are expanded and scrolled into view.
+    """
+
+    FETCH_BATCH = 256
+
+    def __init__(self, headers: List[str], groups: List[TreeGroup], parent=None):
+        super().__init__(parent)
+        self.headers = headers
+        self.groups = groups
+        for row, group in enumerate(groups):
+            group.row = row
+
+    def index(self, row: int, column: int, parent: QModelIndex = QModelIndex()) -> QModelIndex:
+        if not self.hasIndex(row, column, parent):
+            return QModelIndex()
+        if not parent.isValid():
+            return self.createIndex(row, column, None)
+        # Child rows point at their group so parent() can find it
+        return self.createIndex(row, column, self.groups[parent.row()])
+
+    def parent(self, index: QModelIndex) -> QModelIndex:
+        if not index.isValid():
+            return QModelIndex()
+        group = index.internalPointer()
+        if group is None:
+            return QModelIndex()
+        return self.createIndex(group.row, 0, None)
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        if not parent.isValid():
+            return len(self.groups)
+        if parent.internalPointer() is None and parent.column() == 0:
+            return self.groups[parent.row()].fetched
+        return 0
+
+    def hasChildren(self, parent: QModelIndex = QModelIndex()) -> bool:
+        if not parent.isValid():
+            return bool(self.groups)
+        if parent.internalPointer() is None and parent.column() == 0:
+            return bool(self.groups[parent.row()].children)
+        return False
+
+    def canFetchMore(self, parent: QModelIndex) -> bool:
+        if not parent.isValid() or parent.internalPointer() is not None:
+            return False
+        group = self.groups[parent.row()]
+        return group.fetched < len(group.children)
+
+    def fetchMore(self, parent: QModelIndex):
+        if not self.canFetchMore(parent):
+            return
+        group = self.groups[parent.row()]
+        count = min(self.FETCH_BATCH, len(group.children) - group.fetched)
+        self.beginInsertRows(parent, group.fetched, group.fetched + count - 1)
+        group.fetched += count
+        self.endInsertRows()
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return len(self.headers)
+
+    def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole) -> Any:
+        if not index.isValid() or role != Qt.ItemDataRole.DisplayRole:
+            return None
+        group = index.internalPointer()
+        if group is None:
+            columns = self.groups[index.row()].columns
+        else:
+            columns = group.child_columns(group.children[index.row()])
+        return columns[index.column()] if index.column() < len(columns) else None
+
+    def headerData(self, section: int, orientation: Qt.Orientation,
+                   role: int = Qt.ItemDataRole.DisplayRole) -> Any:
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return self.headers[section]
+        return None
@@ -1,3 +1,4 @@
+import logging
 import sys
 from PyQt6.QtWidgets import QApplication, QMainWindow, QTabWidget, QWidget, QVBoxLayout
 from PyQt6.QtCore import Qt
@@ -60,6 +61,7 @@ class IrrigationSystem(QMainWindow):
         self.tabs.setCurrentIndex(strahler_index)
 
 def main():
+    logging.basicConfig(level=logging.WARNING)
     app = QApplication(sys.argv)
     app.setStyle("Fusion")  # Set Fusion style for better cross-platform appearance
     window = IrrigationSystem()
@@ -1,40 +1,82 @@
-from typing import Dict, List, Optional
+from typing import Collection, Dict, Optional, Tuple
 from dataclasses import dataclass, field
 
+# Component type for each two-letter ID prefix; fields use the single prefix 'F'
+_PREFIX_TYPE = {
+    'MC': 'canal',
+    'DP': 'distribution_point',
+    'SW': 'smart_water',
+    'ZT': 'gate'
+}
+
 class NetworkComponent:
     """Base class for network components"""
+    # One instance per network node, so no per-instance __dict__
+    __slots__ = ('id', 'label', '_type', 'connections_to', 'connections_from',
+                 '_connections_to_sorted', '_connections_from_sorted', 'level', 'attributes')
+
     def __init__(self, id: str, label: str):
         self.id: str = id
         self.label: str = label
-        self.connections_to: List[str] = []
-        self.connections_from: List[str] = []
+        self._type: str = self._compute_type()
+        # Insertion-ordered sets (dicts with None values) while the network is
+        # being built, so adding a connection is O(1); tuples once frozen
+        self.connections_to: Collection[str] = {}
+        self.connections_from: Collection[str] = {}
+        # Sorted copies for display, rebuilt lazily after a connection is added
+        self._connections_to_sorted: Optional[Tuple[str, ...]] = None
+        self._connections_from_sorted: Optional[Tuple[str, ...]] = None
         self.level: int = -1  # Hierarchy level
         self.attributes: Dict = {}
 
     @property
     def component_type(self) -> str:
+        """Component type, determined once from the ID prefix"""
+        return self._type
+
+    def _compute_type(self) -> str:
         """Determine component type from ID prefix"""
-        if self.id.startswith('MC'):
-            return 'canal'
-        elif self.id.startswith('DP'):
-            return 'distribution_point'
-        elif self.id.startswith('SW'):
-            return 'smart_water'
-        elif self.id.startswith('ZT'):
-            return 'gate'
-        elif self.id.startswith('F'):
+        comp_type = _PREFIX_TYPE.get(self.id[:2])
+        if comp_type is not None:
+            return comp_type
+        if self.id.startswith('F'):
             return 'field'
         return 'unknown'
 
+    @property
+    def connections_to_sorted(self) -> Tuple[str, ...]:
+        """Outgoing connections in sorted order"""
+        if self._connections_to_sorted is None:
+            self._connections_to_sorted = tuple(sorted(self.connections_to))
+        return self._connections_to_sorted
+
+    @property
+    def connections_from_sorted(self) -> Tuple[str, ...]:
+        """Incoming connections in sorted order"""
+        if self._connections_from_sorted is None:
+            self._connections_from_sorted = tuple(sorted(self.connections_from))
+        return self._connections_from_sorted
+
     def add_connection_to(self, target_id: str):
         """Add outgoing connection"""
         if target_id not in self.connections_to:
-            self.connections_to.append(target_id)
+            if isinstance(self.connections_to, tuple):
+                self.connections_to = dict.fromkeys(self.connections_to)
+            self.connections_to[target_id] = None
+            self._connections_to_sorted = None
 
     def add_connection_from(self, source_id: str):
         """Add incoming connection"""
         if source_id not in self.connections_from:
-            self.connections_from.append(source_id)
+            if isinstance(self.connections_from, tuple):
+                self.connections_from = dict.fromkeys(self.connections_from)
+            self.connections_from[source_id] = None
+            self._connections_from_sorted = None
+
+    def freeze(self):
+        """Store connections as tuples for faster iteration once the topology is final"""
+        self.connections_to = tuple(self.connections_to)
+        self.connections_from = tuple(self.connections_from)
 
     def set_level(self, level: int):
         """Set hierarchy level"""
@@ -1,4 +1,4 @@
-from typing import Dict, List, Set, Tuple, Optional
+from typing import Dict, Iterable, List, Set, Tuple, Optional, Union
 import re
 from models.components import NetworkComponent
 from core.network import IrrigationNetwork
@@ -16,14 +16,21 @@ class MermaidParser:
             'F': 'field'
         }
 
-    def parse(self, content: str) -> IrrigationNetwork:
-        """Parse Mermaid content into network structure"""
+    def parse(self, content: Union[str, Iterable[str]]) -> IrrigationNetwork:
+        """Parse Mermaid content, given as a string or an iterable of lines"""
+        if not isinstance(content, str):
+            return self.parse_stream(content)
+        return self._parse_lines(self._clean_content(content))
+
+    def parse_stream(self, fileobj: Iterable[str]) -> IrrigationNetwork:
+        """Parse Mermaid content from an open text file, line by line"""
+        return self._parse_lines(self._clean_lines(fileobj))
+
+    def _parse_lines(self, lines: List[str]) -> IrrigationNetwork:
+        """Parse cleaned Mermaid lines into network structure"""
         network = IrrigationNetwork()
         print("\nParsing Mermaid network diagram...")
         
-        # Clean and split content
-        lines = self._clean_content(content)
-        
         # First pass: Extract field definitions and class assignments
         field_ids = self._extract_field_ids(lines)
         print(f"\nFound field IDs: {sorted(field_ids)}")
@@ -45,8 +52,12 @@ class MermaidParser:
 
     def _clean_content(self, content: str) -> List[str]:
         """Clean and prepare Mermaid content"""
-        return [line.strip() for line in content.split('\n')
-                if line.strip() and not line.strip().startswith('%%')]
+        return self._clean_lines(content.split('\n'))
+
+    def _clean_lines(self, lines: Iterable[str]) -> List[str]:
+        """Strip lines and drop blanks and comments"""
+        return [line for line in map(str.strip, lines)
+                if line and not line.startswith('%%')]
 
     def _extract_field_ids(self, lines: List[str]) -> Set[str]:
         """Extract field IDs from class assignments"""
@@ -141,25 +152,23 @@ class MermaidParser:
 
     def _print_component_stats(self, network: IrrigationNetwork):
         """Print component statistics"""
-        type_counts = {}
-        for comp_id, comp in network.components.items():
-            comp_type = comp.component_type
-            type_counts[comp_type] = type_counts.get(comp_type, 0) + 1
-        
-        print("\nComponents by type:", type_counts)
+        print("\nComponents by type:", network.get_type_counts())
 
     def _add_connections(self, lines: List[str], network: IrrigationNetwork) -> int:
         """Add connections between components"""
         connection_count = 0
+        # Bound once, these are looked up for every connection line
+        components = network.components
+        add_connection = network.add_connection
+        parse_connection_line = self._parse_connection_line
         
         for line in lines:
             if '-->' in line and ':::' not in line:
-                source, targets = self._parse_connection_line(line)
-                if source and targets:
+                source, targets = parse_connection_line(line)
+                if source in components:
                     for target in targets:
-                        if (source in network.components and 
-                            target in network.components):
-                            network.add_connection(source, target)
+                        if target in components:
+                            add_connection(source, target)
                             connection_count += 1
         
         return connection_count
@@ -195,18 +204,18 @@ class MermaidParser:
 
     def _validate_distribution_points(self, network: IrrigationNetwork, errors: List[str]):
         """Validate distribution point configurations"""
-        for comp_id, component in network.components.items():
-            if comp_id.startswith('DP'):
-                if comp_id != 'DP0' and not component.connections_from:
-                    errors.append(f"Distribution point {comp_id} has no input")
-                if not component.connections_to and not any(c.startswith('F') for c in component.connections_to):
-                    errors.append(f"Distribution point {comp_id} has no output")
+        for comp_id in network.get_components_of_type('distribution_point'):
+            component = network.components[comp_id]
+            if comp_id != 'DP0' and not component.connections_from:
+                errors.append(f"Distribution point {comp_id} has no input")
+            if not component.connections_to:
+                errors.append(f"Distribution point {comp_id} has no output")
 
     def _validate_smart_water_meters(self, network: IrrigationNetwork, errors: List[str]):
         """Validate smart water meter configurations"""
-        for comp_id, component in network.components.items():
-            if comp_id.startswith('SW'):
-                if len(component.connections_from) != 1:
-                    errors.append(f"Smart water meter {comp_id} should have exactly one input")
-                if len(component.connections_to) != 1:
-                    errors.append(f"Smart water meter {comp_id} should have exactly one output")
\ No newline at end of file
+        for comp_id in network.get_components_of_type('smart_water'):
+            component = network.components[comp_id]
+            if len(component.connections_from) != 1:
+                errors.append(f"Smart water meter {comp_id} should have exactly one input")
+            if len(component.connections_to) != 1:
+                errors.append(f"Smart water meter {comp_id} should have exactly one output")
\ No newline at end of file
@@ -0,0 +1,42 @@
+import random
+import unittest
+from core import _strahler_numba
+from core.network import IrrigationNetwork
+from core.strahler import StrahlerAnalyzer
+
+@unittest.skipUnless(_strahler_numba.HAVE_NUMBA, "numba is not installed")
+class StrahlerBackendOrderTest(unittest.TestCase):
+    """The Numba kernel and the pure-Python sweep must agree on results and order"""
+
+    def _random_network(self, rng: random.Random, allow_cycles: bool) -> IrrigationNetwork:
+        network = IrrigationNetwork()
+        n = rng.randint(1, 30)
+        for i in range(n):
+            network.add_component(f"DP{i}", f"DP{i}")
+        for _ in range(rng.randint(0, 2 * n)):
+            if n < 2:
+                break
+            a, b = rng.sample(range(n), 2)
+            if a > b and not (allow_cycles and rng.random() < 0.1):
+                a, b = b, a
+            network.add_connection(f"DP{a}", f"DP{b}")
+        return network
+
+    def _assert_same_order(self, network: IrrigationNetwork):
+        csr = network.build_csr()
+        compiled = StrahlerAnalyzer(use_numba=True).analyze_csr(csr)
+        python = StrahlerAnalyzer(use_numba=False).analyze_csr(csr)
+        self.assertEqual(list(compiled.items()), list(python.items()))
+
+    def test_acyclic_networks(self):
+        rng = random.Random(0)
+        for _ in range(300):
+            self._assert_same_order(self._random_network(rng, allow_cycles=False))
+
+    def test_cyclic_networks(self):
+        rng = random.Random(1)
+        for _ in range(300):
+            self._assert_same_order(self._random_network(rng, allow_cycles=True))
+
+if __name__ == '__main__':
+    unittest.main()